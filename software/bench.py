@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+johnbot2 host controller benchmarks
+
+Micro- and loopback benchmarks for the host-side controller in johnbot2.py.
+Every benchmark runs on localhost only; no robots are needed.
+
+Usage:
+    python bench.py ingest [--robots N] [--rate HZ] [--seconds S]
+    python bench.py decode [--packets N]
+    python bench.py motor [--sends N]
+    python bench.py transport [--robots N [N ...]] [--sends N]
+    python bench.py law [--calls N]
+    python bench.py tick [--robots N [N ...]] [--rounds N]
+    python bench.py sigmoid [--alphas A [A ...]] [--calls N]
+    python bench.py filter [--robots N [N ...]] [--packets N]
+    python bench.py log [--robots N [N ...]] [--frames N] [--compression C [C ...]]
+    python bench.py events [--robots N] [--packets N]
+"""
+
+import argparse
+from fractions import Fraction
+import glob
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+from pythonosc import osc_message, osc_message_builder, udp_client
+
+import johnbot2
+import log_tools
+
+# Benchmarks use their own port range so they can run next to a live controller
+BENCH_SENSOR_BASE_PORT = 62000
+BENCH_MOTOR_BASE_PORT = 63000
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+
+def sensor_packet(left: int, right: int) -> bytes:
+    """
+    Build a /sensor datagram exactly as the firmware sends it (two int32 arguments).
+    """
+    builder = osc_message_builder.OscMessageBuilder(address="/sensor")
+    builder.add_arg(left, "i")
+    builder.add_arg(right, "i")
+    return builder.build().dgram
+
+
+def configure_loopback(num_robots: int) -> None:
+    """
+    Point the controller at localhost and reset its per-robot state.
+
+    Coalescing is switched off so every packet offered is actually handled.
+    """
+    johnbot2.NUM_ROBOTS = num_robots
+    johnbot2.SENSOR_BASE_PORT = BENCH_SENSOR_BASE_PORT
+    johnbot2.MOTOR_BASE_PORT = BENCH_MOTOR_BASE_PORT
+    johnbot2.ROBOT_IP_TEMPLATE = "127.0.0.1"
+    johnbot2.COALESCE_SENSOR_PACKETS = False
+    johnbot2.running = True
+    johnbot2.robot_states = johnbot2.new_robot_states(num_robots)
+    johnbot2.robot_buffer = johnbot2.RobotBuffer(num_robots)
+    johnbot2.reset_tick_state(num_robots)
+    johnbot2.assign_control_laws(num_robots)
+    johnbot2.setup_sensor_filter(num_robots)
+    johnbot2.setup_sensor_predictor(num_robots)
+    johnbot2.setup_motor_shaper(num_robots)
+    johnbot2.motor_clients = johnbot2.setup_motor_clients()
+
+
+def time_per_call(fn, repeat: int) -> float:
+    """
+    Best-of-three wall time of `repeat` calls to fn(), in microseconds per call.
+    """
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return 1e6 * best / repeat
+
+
+def sender_process(num_robots: int, rate: float, seconds: float) -> None:
+    """
+    Emulate num_robots robots sending /sensor at `rate` Hz each (0 = as fast as possible).
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packets = [sensor_packet(10 + i % 200, 200 - i % 200) for i in range(num_robots)]
+    targets = [("127.0.0.1", BENCH_SENSOR_BASE_PORT + i) for i in range(num_robots)]
+
+    deadline = time.monotonic() + seconds
+    period = 1.0 / rate if rate > 0 else 0.0
+    next_tick = time.monotonic()
+    while time.monotonic() < deadline:
+        for packet, target in zip(packets, targets):
+            sock.sendto(packet, target)
+        if period:
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    sock.close()
+
+# -----------------------------------------------------------------------------
+# Ingest: ThreadingOSCUDPServer per robot vs one selector loop
+# -----------------------------------------------------------------------------
+
+def run_ingest(mode: str, num_robots: int, rate: float, seconds: float) -> tuple[float, float, float]:
+    """
+    Run one ingest mode against a loopback sender.
+
+    Returns (packets/s, CPU %, packets per selector wakeup).
+    """
+    configure_loopback(num_robots)
+
+    if mode == "selector":
+        sel = johnbot2.setup_sensor_selector()
+        thread = threading.Thread(target=johnbot2.selector_ingest_loop, args=(sel,), daemon=True)
+        thread.start()
+    else:
+        servers = johnbot2.setup_sensor_servers()
+
+    stats = johnbot2.IngestStats()
+    sender = multiprocessing.Process(target=sender_process, args=(num_robots, rate, seconds))
+    sender.start()
+    sender.join()
+    time.sleep(0.2)  # let in-flight datagrams drain
+    packets_per_second, cpu_percent = stats.sample()
+
+    johnbot2.running = False
+    if mode == "selector":
+        thread.join()
+        johnbot2.close_sensor_selector(sel)
+    else:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    return packets_per_second, cpu_percent, stats.packets_per_wakeup
+
+
+def bench_ingest(args) -> None:
+    offered = "max" if args.rate <= 0 else f"{args.robots * args.rate:.0f}"
+    print(f"Ingest: {args.robots} robots, offered {offered} packets/s, {args.seconds:.0f} s")
+    for mode in ("threaded", "selector"):
+        packets_per_second, cpu_percent, per_wakeup = run_ingest(
+            mode, args.robots, args.rate, args.seconds
+        )
+        batching = f"   {per_wakeup:5.2f} packets/wakeup" if per_wakeup else ""
+        print(f"  {mode:<10} {packets_per_second:10.1f} packets/s   CPU {cpu_percent:6.1f}%{batching}")
+
+# -----------------------------------------------------------------------------
+# Decode: Dispatcher path vs fixed-layout /sensor fast path
+# -----------------------------------------------------------------------------
+
+def bench_decode(args) -> None:
+    configure_loopback(1)
+    packet = sensor_packet(120, 80)
+    client_address = ("127.0.0.1", 50000)
+    disp = johnbot2.make_sensor_dispatcher(0)
+
+    def parse_generic():
+        msg = osc_message.OscMessage(packet)
+        return float(msg.params[0]), float(msg.params[1])
+
+    unpack_from = johnbot2._sensor_args.unpack_from
+    offset = johnbot2.SENSOR_ARGS_OFFSET
+
+    def parse_fast():
+        left, right = unpack_from(packet, offset)
+        return float(left), float(right)
+
+    print(f"Decode only ({args.packets} packets)")
+    print(f"  OscMessage + float()   {time_per_call(parse_generic, args.packets):8.3f} us/packet")
+    print(f"  struct.unpack_from     {time_per_call(parse_fast, args.packets):8.3f} us/packet")
+
+    # Full handler path: decode + control law + state/log update + /motor send
+    batch = johnbot2.DatagramBatch()
+    for i in range(len(batch.buffers)):
+        batch.views[i][:len(packet)] = packet
+        batch.sizes[i] = len(packet)
+        batch.addresses[i] = client_address
+    batch.count = len(batch.buffers)
+    rounds = max(1, args.packets // batch.count)
+
+    def run_batch():
+        johnbot2.handle_sensor_batch(0, disp, batch)
+
+    print(f"Decode + control + /motor send ({rounds * batch.count} packets)")
+    for fast_path in (False, True):
+        johnbot2.SENSOR_FAST_PATH = fast_path
+        per_packet = time_per_call(run_batch, rounds) / batch.count
+        label = "fast path" if fast_path else "Dispatcher"
+        print(f"  {label:<22} {per_packet:8.3f} us/packet")
+
+# -----------------------------------------------------------------------------
+# Motor: OscMessageBuilder per send vs pre-encoded template
+# -----------------------------------------------------------------------------
+
+def bench_motor(args) -> None:
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    address = sink.getsockname()
+    values = [120, 80]
+
+    client = udp_client.SimpleUDPClient(*address)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    link = johnbot2.MotorLink(sock, address)
+
+    def drain():
+        sink.setblocking(False)
+        try:
+            while True:
+                sink.recv(64)
+        except BlockingIOError:
+            pass
+
+    def send_builder():
+        client.send_message("/motor", values)
+
+    def send_template():
+        link.send_motor(120, 80)
+
+    # Keep the sink's receive queue from filling up between rounds
+    rounds = max(1, args.sends // 1000)
+
+    def run(send):
+        for _ in range(1000):
+            send()
+        drain()
+
+    print(f"/motor send ({rounds * 1000} sends)")
+    for label, send in (("send_message (builder)", send_builder), ("template + sendto", send_template)):
+        per_send = time_per_call(lambda: run(send), rounds) / 1000
+        print(f"  {label:<24} {per_send:8.3f} us/send")
+
+    sink.close()
+    sock.close()
+
+# -----------------------------------------------------------------------------
+# Transport: per-robot vs shared vs connected motor sockets
+# -----------------------------------------------------------------------------
+
+def bench_transport(args) -> None:
+    # All robots point at one loopback sink; a full sink queue just drops datagrams
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    address = sink.getsockname()
+
+    print(f"Motor transport ({args.sends} sends, round-robin over robots)")
+    for num_robots in args.robots:
+        for transport in ("per_robot", "shared", "connected"):
+            links = johnbot2.setup_motor_clients([address] * num_robots, transport)
+            sends = [link.send_motor for link in links]
+            rounds = max(1, args.sends // num_robots)
+
+            def send_all():
+                for send in sends:
+                    send(120, 80)
+
+            per_send = time_per_call(send_all, rounds) / num_robots
+            johnbot2.close_motor_clients(links)
+            print(
+                f"  N={num_robots:<5} {transport:<10} {1e6 / per_send:12.0f} sends/s"
+                f"   ({per_send:.3f} us/send)"
+            )
+
+    sink.close()
+
+# -----------------------------------------------------------------------------
+# Law: scalar map_sensors_to_motors vs 256x256 lookup table
+# -----------------------------------------------------------------------------
+
+def bench_law(args) -> None:
+    rng = random.Random(0)
+    readings = [
+        (float(rng.randint(0, 255)), float(rng.randint(0, 255))) for _ in range(10000)
+    ]
+    rounds = max(1, args.calls // len(readings))
+
+    build_start = time.perf_counter()
+    johnbot2.rebuild_motor_table()
+    build_ms = 1000.0 * (time.perf_counter() - build_start)
+
+    mismatches = sum(
+        johnbot2.lookup_motors(float(sl), float(sr)) != johnbot2.map_sensors_to_motors(float(sl), float(sr))
+        for sl in range(256)
+        for sr in range(256)
+    )
+
+    def run(law):
+        def call_all():
+            for sl, sr in readings:
+                law(sl, sr)
+        return time_per_call(call_all, rounds) / len(readings)
+
+    print(f"Control law ({rounds * len(readings)} integer readings)")
+    print(f"  map_sensors_to_motors  {run(johnbot2.map_sensors_to_motors):8.3f} us/call")
+    print(f"  lookup_motors          {run(johnbot2.lookup_motors):8.3f} us/call")
+    print(f"  robot_laws[0]          {run(johnbot2.control_law_for(0).scalar):8.3f} us/call"
+          f"   ({johnbot2.control_law_for(0).name})")
+    print(f"  table build {build_ms:.0f} ms, {mismatches} mismatches over all 65536 pairs")
+
+    left = np.array([sl for sl, _ in readings])
+    right = np.array([sr for _, sr in readings])
+    for size in (10, 100, 1000, 10000):
+        per_call = time_per_call(
+            lambda: johnbot2.map_sensors_to_motors_batch(left[:size], right[:size]),
+            max(1, args.calls // size),
+        )
+        print(f"  map_sensors_to_motors_batch, {size:>5} robots  {per_call / size:8.3f} us/reading")
+
+# -----------------------------------------------------------------------------
+# Tick: per-packet reactive control vs one batched control tick
+# -----------------------------------------------------------------------------
+
+def bench_tick(args) -> None:
+    print(f"Control step cost per period, every robot reporting once ({args.rounds} periods)")
+    for num_robots in args.robots:
+        configure_loopback(num_robots)
+        rng = random.Random(0)
+        readings = [
+            (float(rng.randint(0, 255)), float(rng.randint(0, 255))) for _ in range(num_robots)
+        ]
+
+        def reactive():
+            for robot_id, (sl, sr) in enumerate(readings):
+                johnbot2.handle_sensor_values(robot_id, sl, sr)
+
+        def tick():
+            for robot_id, (sl, sr) in enumerate(readings):
+                johnbot2.store_sensor_values(robot_id, sl, sr)
+            johnbot2.run_control_tick(time.monotonic())
+
+        johnbot2.CONTROL_MODE = "reactive"
+        reactive_us = time_per_call(reactive, args.rounds)
+        johnbot2.CONTROL_MODE = "tick"
+        tick_us = time_per_call(tick, args.rounds)
+        johnbot2.CONTROL_MODE = "reactive"
+        johnbot2.close_motor_clients(johnbot2.motor_clients)
+
+        print(
+            f"  N={num_robots:<5} reactive {reactive_us / num_robots:8.3f} us/robot"
+            f"   tick {tick_us / num_robots:8.3f} us/robot"
+        )
+
+# -----------------------------------------------------------------------------
+# Sigmoid: ratio-form sharp_sigmoid vs the direct formula, over alpha
+# -----------------------------------------------------------------------------
+
+def direct_sigmoid(x: float, alpha: float) -> float:
+    """
+    The paper's formula evaluated as written: x^α / (x^α + (1 - x)^α).
+    """
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    xn = x ** alpha
+    yn = (1.0 - x) ** alpha
+    return xn / (xn + yn)
+
+
+def sigmoid_error(sigmoid, points: list[float], alpha: int) -> tuple[float, int]:
+    """
+    Max absolute error of sigmoid() against the exact rational value for an
+    integer alpha, and the number of points where it fails (NaN or 0/0).
+    """
+    worst = 0.0
+    failures = 0
+    for x in points:
+        try:
+            value = sigmoid(x, alpha)
+        except ZeroDivisionError:
+            failures += 1
+            continue
+        if value != value:
+            failures += 1
+            continue
+        xf = Fraction(x) ** alpha
+        exact = xf / (xf + (1 - Fraction(x)) ** alpha)
+        worst = max(worst, abs(float(Fraction(value) - exact)))
+    return worst, failures
+
+
+def bench_sigmoid(args) -> None:
+    # Every ratio r_hat the control law can see for integer readings 0..255
+    points = sorted({(sr + 1.0) / (sl + sr + 2.0) for sl in range(256) for sr in range(256)})
+    sample = points[::len(points) // 200]
+    batch = np.array(points)
+
+    print(f"sharp_sigmoid sweep ({len(points)} distinct ratios, {args.calls} scalar calls)")
+    print(f"  {'alpha':>7} {'direct':>9} {'ratio':>9} {'batch':>9} {'table':>8} {'motor diff':>10}"
+          f"   {'direct err':>10} {'fail':>4}   {'ratio err':>10} {'fail':>4}")
+    for alpha in args.alphas:
+        alpha = int(alpha) if alpha.is_integer() else alpha
+        calls = [points[i % len(points)] for i in range(args.calls)]
+
+        def run(sigmoid):
+            def call_all():
+                for x in calls:
+                    try:
+                        sigmoid(x, alpha)
+                    except ZeroDivisionError:
+                        pass
+            return time_per_call(call_all, 1) / len(calls)
+
+        direct_us = run(direct_sigmoid)
+        ratio_us = run(johnbot2.sharp_sigmoid)
+        batch_us = time_per_call(lambda: johnbot2.sharp_sigmoid_batch(batch, alpha), 1) / len(points)
+        build_ms = time_per_call(lambda: johnbot2.MotorTable(200, alpha), 1) / 1000.0
+        # Ratios whose rounded motor command (M_max = 200) differs between scalar and batch
+        scalar = np.array([johnbot2.sharp_sigmoid(x, alpha) for x in points])
+        motor_diff = int(np.count_nonzero(
+            np.rint(200.0 * scalar) != np.rint(200.0 * johnbot2.sharp_sigmoid_batch(batch, alpha))
+        ))
+
+        row = (f"  {alpha:>7} {direct_us:7.3f}us {ratio_us:7.3f}us {batch_us:7.3f}us {build_ms:6.1f}ms"
+               f" {motor_diff:10d}")
+        if isinstance(alpha, int):
+            direct_err, direct_fail = sigmoid_error(direct_sigmoid, sample, alpha)
+            ratio_err, ratio_fail = sigmoid_error(johnbot2.sharp_sigmoid, sample, alpha)
+            row += (f"   {direct_err:10.2e} {direct_fail:4d}   {ratio_err:10.2e} {ratio_fail:4d}")
+        print(row)
+
+# -----------------------------------------------------------------------------
+# Filter: per-packet and per-tick cost of each sensor filter
+# -----------------------------------------------------------------------------
+
+def bench_filter(args) -> None:
+    print(f"Sensor filters ({args.packets} packets per size)")
+    for name, filter_class in johnbot2.SENSOR_FILTERS.items():
+        for num_robots in args.robots:
+            sensor_filter = filter_class(num_robots)
+            rng = random.Random(0)
+            packets = [
+                (rng.randrange(num_robots), float(rng.randint(0, 255)), float(rng.randint(0, 255)))
+                for _ in range(args.packets)
+            ]
+            clock = [1.0]
+
+            def per_packet():
+                for robot_id, sl, sr in packets:
+                    clock[0] += 0.0001
+                    sensor_filter.update(robot_id, sl, sr, clock[0])
+
+            robot_ids = np.arange(num_robots)
+            left = np.array([float(rng.randint(0, 255)) for _ in range(num_robots)])
+            right = np.array([float(rng.randint(0, 255)) for _ in range(num_robots)])
+
+            def per_tick():
+                clock[0] += 0.1
+                sensor_filter.update_batch(robot_ids, left, right, np.full(num_robots, clock[0]))
+
+            packet_us = time_per_call(per_packet, 1) / len(packets)
+            tick_us = time_per_call(per_tick, max(1, args.packets // num_robots)) / num_robots
+            print(f"  {name:<9} N={num_robots:<5} update {packet_us:7.3f} us/packet"
+                  f"   update_batch {tick_us:7.3f} us/robot")
+
+# -----------------------------------------------------------------------------
+# Log: CSV vs binary frame records
+# -----------------------------------------------------------------------------
+
+def bench_log(args) -> None:
+    print(f"Frame logging ({args.frames} frames per size; producer = snapshot + queue, "
+          f"writer = log writer thread)")
+    # Room for every frame, so the benchmark measures writing rather than dropping
+    johnbot2.LOG_QUEUE_FRAMES = 3 * args.frames
+    with tempfile.TemporaryDirectory() as log_dir:
+        for num_robots in args.robots:
+            johnbot2.NUM_ROBOTS = num_robots
+            johnbot2.robot_buffer = johnbot2.RobotBuffer(num_robots)
+            rng = np.random.default_rng(0)
+            # Timestamped ahead so no robot goes stale during the run
+            for robot_id in range(num_robots):
+                johnbot2.robot_buffer.write(
+                    robot_id, time.time() + 3600.0, *rng.integers(0, 256, 2).tolist(), 0, 0,
+                )
+            # Readings follow a mean-reverting integer random walk from frame to
+            # frame (motors follow), so the compressors see changing data; this
+            # adds a few us per frame to the producer
+            rows = np.frombuffer(johnbot2.robot_buffer.values).reshape(num_robots, -1)
+            steps = rng.normal(0.0, 3.0, size=(1009, num_robots, 2))
+
+            for log_format, compression in [
+                (log_format, compression)
+                for log_format in ("csv", "binary")
+                for compression in args.compression
+            ]:
+                johnbot2.LOG_COMPRESSION = None if compression == "none" else compression
+                johnbot2.LOG_DIR = os.path.join(log_dir, f"{log_format}_{compression}_{num_robots}")
+                johnbot2.setup_csv_logging(log_format)
+                writer = johnbot2.log_writer
+
+                frame_index = [0]
+
+                def one_frame():
+                    frame_index[0] += 1
+                    sensors = rows[:, 2:4]
+                    sensors += steps[frame_index[0] % len(steps)] + 0.05 * (128.0 - sensors)
+                    np.clip(np.rint(sensors), 0.0, 255.0, out=sensors)
+                    rows[:, 4:6] = np.where(rows[:, 2:4] > 127.0, 200.0, 0.0)
+                    johnbot2.write_frame_to_csv(frame_index[0])
+
+                frame_us = time_per_call(one_frame, args.frames)
+                johnbot2.close_log_files()
+                writer_us = 1e6 * writer.write_time / writer.frames
+
+                (path,) = glob.glob(os.path.join(johnbot2.LOG_DIR, "johnbot2_*"))
+                load = log_tools.load_csv_log if log_format == "csv" else log_tools.load_binary_log
+                start = time.perf_counter()
+                data = load(path)
+                load_ms = 1000.0 * (time.perf_counter() - start)
+                frames = len(data[1]) if log_format == "csv" else len(data)
+                print(f"  {log_format:<6} {compression:<5} N={num_robots:<5} producer {frame_us:7.1f} us/frame"
+                      f"   writer {writer_us:7.1f} us/frame"
+                      f"   {os.path.getsize(path) / frames:7.0f} bytes/frame"
+                      f"   load {load_ms:7.1f} ms ({frames} frames)")
+
+# -----------------------------------------------------------------------------
+# Events: raw event log cost per event vs per handled packet
+# -----------------------------------------------------------------------------
+
+def bench_events(args) -> None:
+    configure_loopback(args.robots)
+    rng = random.Random(0)
+    readings = [
+        (robot_id % args.robots, float(rng.randint(0, 255)), float(rng.randint(0, 255)))
+        for robot_id in range(1000)
+    ]
+    rounds = max(1, args.packets // len(readings))
+
+    def handle_all():
+        for robot_id, sl, sr in readings:
+            johnbot2.handle_sensor_values(robot_id, sl, sr)
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        events = johnbot2.EventLog(os.path.join(log_dir, "bench.events"))
+
+        def record_all():
+            for robot_id, sl, sr in readings:
+                events.record(robot_id, johnbot2.EVENT_SENSOR, sl, sr)
+
+        record_us = time_per_call(record_all, rounds) / len(readings)
+
+        # The same with a single recording thread (no lock), as under selector ingest
+        ingest_mode, johnbot2.INGEST_MODE = johnbot2.INGEST_MODE, "selector"
+        single = johnbot2.EventLog(os.path.join(log_dir, "single.events"))
+        johnbot2.INGEST_MODE = ingest_mode
+
+        def record_single():
+            for robot_id, sl, sr in readings:
+                single.record(robot_id, johnbot2.EVENT_SENSOR, sl, sr)
+
+        single_us = time_per_call(record_single, rounds) / len(readings)
+        single.close()
+        # Timed off both before and after on, since a busy host drifts
+        handler_us = time_per_call(handle_all, rounds) / len(readings)
+        johnbot2.event_log = events
+        logged_us = time_per_call(handle_all, rounds) / len(readings)
+        johnbot2.event_log = None
+        handler_us = min(handler_us, time_per_call(handle_all, rounds) / len(readings))
+        events.close()
+        johnbot2.close_motor_clients(johnbot2.motor_clients)
+
+        path = os.path.join(log_dir, "bench.events")
+        loaded = log_tools.load_event_log([path])
+        size = os.path.getsize(path)
+
+    print(f"Raw event log, N={args.robots}, {3 * rounds * len(readings)} packets per variant "
+          f"(batch {johnbot2.EVENT_LOG_BATCH} events, {johnbot2.EVENT_LOG_BUFFERS} buffers)")
+    print(f"  EventLog.record()            {record_us:8.3f} us/event")
+    print(f"  EventLog.record(), no lock   {single_us:8.3f} us/event (one recording thread)")
+    print(f"  handle_sensor_values, off    {handler_us:8.3f} us/packet")
+    print(f"  handle_sensor_values, on     {logged_us:8.3f} us/packet (sensor + /motor event, "
+          f"{100.0 * (logged_us - handler_us) / handler_us:+.0f}%)")
+    print(f"  {loaded.size} events written, {events.dropped} dropped, {size / max(1, loaded.size):.1f} bytes/event")
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="johnbot2 host controller benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="threaded servers vs selector loop")
+    ingest.add_argument("--robots", type=int, default=10)
+    ingest.add_argument("--rate", type=float, default=10.0, help="Hz per robot, 0 = flood")
+    ingest.add_argument("--seconds", type=float, default=5.0)
+    ingest.set_defaults(func=bench_ingest)
+
+    decode = subparsers.add_parser("decode", help="Dispatcher vs /sensor fast-path decoder")
+    decode.add_argument("--packets", type=int, default=100000)
+    decode.set_defaults(func=bench_decode)
+
+    motor = subparsers.add_parser("motor", help="OSC builder vs pre-encoded /motor template")
+    motor.add_argument("--sends", type=int, default=100000)
+    motor.set_defaults(func=bench_motor)
+
+    transport = subparsers.add_parser("transport", help="motor socket layouts at several swarm sizes")
+    transport.add_argument("--robots", type=int, nargs="+", default=[10, 100, 1000])
+    transport.add_argument("--sends", type=int, default=100000)
+    transport.set_defaults(func=bench_transport)
+
+    law = subparsers.add_parser("law", help="scalar control law vs lookup table")
+    law.add_argument("--calls", type=int, default=200000)
+    law.set_defaults(func=bench_law)
+
+    tick = subparsers.add_parser("tick", help="reactive control vs batched control tick")
+    tick.add_argument("--robots", type=int, nargs="+", default=[10, 100, 1000])
+    tick.add_argument("--rounds", type=int, default=200)
+    tick.set_defaults(func=bench_tick)
+
+    sigmoid = subparsers.add_parser("sigmoid", help="sharp_sigmoid forms over a sweep of alpha")
+    sigmoid.add_argument("--alphas", type=float, nargs="+",
+                         default=[1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0, 256.0, 512.0, 1024.0, 2048.0, 2.5, 7.5])
+    sigmoid.add_argument("--calls", type=int, default=100000)
+    sigmoid.set_defaults(func=bench_sigmoid)
+
+    filter_parser = subparsers.add_parser("filter", help="sensor filter cost per packet and per tick")
+    filter_parser.add_argument("--robots", type=int, nargs="+", default=[10, 100, 1000])
+    filter_parser.add_argument("--packets", type=int, default=50000)
+    filter_parser.set_defaults(func=bench_filter)
+
+    log = subparsers.add_parser("log", help="CSV vs binary frame log: write cost, size, load time")
+    log.add_argument("--robots", type=int, nargs="+", default=[10, 100, 1000])
+    log.add_argument("--frames", type=int, default=2000)
+    log.add_argument("--compression", nargs="+", choices=["none", "gzip", "lzma"],
+                     default=["none", "gzip", "lzma"])
+    log.set_defaults(func=bench_log)
+
+    events = subparsers.add_parser("events", help="raw event log: cost per event vs per handled packet")
+    events.add_argument("--robots", type=int, default=10)
+    events.add_argument("--packets", type=int, default=100000)
+    events.set_defaults(func=bench_events)
+
+    args = parser.parse_args()
+    johnbot2.logger.setLevel(johnbot2.logging.WARNING)
+    args.func(args)
@@ -9,19 +9,40 @@ It:
 - receives left/right light sensor values from each robot via OSC,
 - computes motor commands using the phototaxis mapping defined in the paper,
 - sends motor commands back to each robot via OSC, and
-- logs sensor/motor data at 24 fps to a CSV file for later analysis.
+- logs sensor/motor data at 24 fps to a CSV (or binary) file for later analysis.
 """
 
-from pythonosc import dispatcher, osc_server, udp_client
+from pythonosc import dispatcher, osc_message_builder, osc_server
+from abc import ABC, abstractmethod
+from array import array
+import asyncio
+from bisect import bisect_left
+from collections import deque
+from contextlib import nullcontext
 import threading
 import time
 import logging
 import csv
+import io
+import json
 import os
+import re
 import signal
 import sys
 from datetime import datetime
+from fractions import Fraction
+from functools import partial
+import gzip
+import lzma
 import math
+import multiprocessing
+from multiprocessing import shared_memory
+import selectors
+import socket
+import struct
+from typing import Callable, Optional
+
+import numpy as np
 
 # -----------------------------------------------------------------------------
 # Configuration
@@ -29,22 +50,172 @@ import math
 
 NUM_ROBOTS = 10
 
+# Controller mode:
+#   "threads" - daemon threads for ingest, monitoring and CSV logging (see INGEST_MODE)
+#   "asyncio" - sensor ingest, motor sends, CSV frames and monitoring as coroutines
+#               on one asyncio event loop, with no locks on the hot path
+CONTROLLER_MODE = "threads"
+
 # Network configuration
 SENSOR_BASE_PORT = 60000   # robots send /sensor to these ports (60000 + robot_id)
 MOTOR_BASE_PORT = 61000    # host sends /motor to these ports (61000 + robot_id)
 ROBOT_IP_TEMPLATE = "192.168.50.{}"  # filled with (50 + robot_id)
+ROBOT_REGISTRY_FILE = None # optional CSV with "robot_id,ip" rows, overrides ROBOT_IP_TEMPLATE
+
+# Single-port ingest (INGEST_MODE == "selector" only): if set, every robot sends
+# /sensor to this one UDP port and is identified by its source IP address
+SENSOR_SINGLE_PORT = None
+SENSOR_SOCKET_RCVBUF = 4 * 1024 * 1024  # receive buffer for the shared sensor socket
+
+# Multi-process ingest (INGEST_MODE == "selector", Linux only): fork this many
+# worker processes that each bind the sensor socket(s) with SO_REUSEPORT, so the
+# kernel spreads robots across cores. 0 = ingest in the main process.
+INGEST_WORKERS = 0
+
+# Motor transport (CONTROLLER_MODE == "threads" only):
+#   "per_robot" - one unconnected UDP socket per robot, sendto() per command
+#   "shared"    - one UDP socket for all robots, sendto() with pre-resolved addresses
+#   "connected" - one connect()ed UDP socket per robot, send() without an address
+#                 (one fd per robot; raise the fd limit for very large swarms)
+MOTOR_TRANSPORT = "per_robot"
+
+# Sensor ingest mode (CONTROLLER_MODE == "threads" only):
+#   "threaded" - one ThreadingOSCUDPServer per robot (one thread per datagram)
+#   "selector" - one selector (epoll on Linux) loop owns every sensor socket
+INGEST_MODE = "threaded"
+INGEST_BUFFER_SIZE = 1024  # max datagram size read from a sensor socket
+INGEST_BATCH_SIZE = 64     # max datagrams drained from one socket per wakeup
+SENSOR_FAST_PATH = True    # selector ingest: decode firmware /sensor packets without the Dispatcher
+COALESCE_SENSOR_PACKETS = True  # selector ingest: of a robot's queued /sensor packets, handle only the newest
 
 # Control law parameters (as in the paper)
 MOTOR_MAX_OUTPUT = 200     # M_max in the paper
 SIGMOID_ALPHA = 8          # α in the paper
+MOTOR_LOOKUP_TABLE = True  # precomputed (ML, MR) for integer sensor values 0..255
+SENSOR_MAX_VALUE = 255     # firmware maps analogRead() 0..1023 to 0..255
+
+# Per-robot sensor calibration: optional CSV with
+# "robot_id,left_gain,left_offset,right_gain,right_offset" rows (see
+# `log_tools.py fit-calibration`). The control law then sees gain * raw + offset
+# per side; the CSV log keeps the raw readings.
+CALIBRATION_FILE = None
+CALIBRATION_ROUND = True   # round calibrated readings to integers, so the lookup table still applies
+
+# Sensor filtering, applied after calibration and before the control law:
+#   None        - no filtering
+#   "ema"       - exponential moving average, weight FILTER_EMA_WEIGHT on the newest reading
+#   "median"    - moving median of the last FILTER_WINDOW readings
+#   "one_euro"  - one-euro filter (FILTER_MIN_CUTOFF, FILTER_BETA, FILTER_D_CUTOFF)
+# The CSV then also logs robot<i>_filtered_left/right (the control law's input).
+SENSOR_FILTER = None
+FILTER_EMA_WEIGHT = 0.5
+FILTER_WINDOW = 5
+FILTER_MIN_CUTOFF = 1.0    # Hz, one-euro cutoff at rest
+FILTER_BETA = 0.05         # one-euro cutoff increase per unit/s of change
+FILTER_D_CUTOFF = 1.0      # Hz, one-euro cutoff for the derivative
+FILTER_RESET_AFTER = 1.0   # restart a robot's filter after this long without readings (s)
+
+# Latency compensation, applied after filtering: each robot's readings are tracked
+# by an alpha-beta filter (value and rate of change) and extrapolated to the
+# expected actuation time, which is
+#   time since the reading arrived (host processing, tick wait)
+#   + PREDICTION_LATENCY (Wi-Fi round trip and motor response, not visible to the host)
+#   + half the command hold time (the robot's measured packet interval, or the tick period)
+# capped at PREDICTION_MAX_HORIZON. `log_tools.py eval-prediction` scores it on logs.
+SENSOR_PREDICTION = False
+PREDICTION_LATENCY = 0.03      # s
+PREDICTION_ALPHA = 0.5         # alpha-beta gain on the value
+PREDICTION_BETA = 0.1          # alpha-beta gain on the rate of change
+PREDICTION_MAX_HORIZON = 0.5   # s
+
+# Motor output shaping after the control law, per robot:
+#   MOTOR_SMOOTHING  - EMA weight on the newly requested ML/MR (1.0 = no smoothing)
+#   MOTOR_SLEW_RATE  - maximum change of ML/MR per second (None = no limit);
+#                      e.g. 1000.0 turns a 0 -> 200 jump into a 0.2 s ramp
+# With either set, the CSV logs the law's output as robot<i>_requested_left/right
+# and the values actually sent as robot<i>_motor_left/right.
+MOTOR_SMOOTHING = 1.0
+MOTOR_SLEW_RATE = None
+MOTOR_SLEW_MAX_DT = 0.2    # longest time credited to one slew step (first command, gaps) (s)
+
+# Control law per robot, by name in the control law registry. Built in:
+#   "phototaxis"      - the paper's law with MOTOR_MAX_OUTPUT / SIGMOID_ALPHA above
+#   "antiphototaxis"  - the same law with the sensors swapped (turns away from light)
+# "<law>@<alpha>" (e.g. "phototaxis@4") runs a built-in law with its own alpha.
+DEFAULT_CONTROL_LAW = "phototaxis"
+ROBOT_CONTROL_LAWS = {}    # robot_id -> law name, e.g. {0: "antiphototaxis", 3: "phototaxis@4"}
+
+# Runtime parameter updates: if set, an OSC server on this UDP port accepts
+#   /config/motor_max <M_max>   /config/alpha <alpha>   /config <M_max> <alpha>
+# and swaps the new values in without a restart. The CSV then also gets
+# param_epoch, param_swap_time, motor_max and sigmoid_alpha columns.
+CONFIG_PORT = None
+
+# Control scheduling:
+#   "reactive" - compute and send /motor inside the /sensor handler, per packet
+#   "tick"     - store the latest readings and, CONTROL_RATE_HZ times per second,
+#                run one batched control step for the whole swarm and send all
+#                motor commands together
+CONTROL_MODE = "reactive"
+CONTROL_RATE_HZ = 10.0
+TICK_STALE_AFTER = 0.5     # robots without a reading for this long are not driven (s)
 
 # Logging configuration
 LOG_DIR = "robot_logs"
 FRAME_INTERVAL = 1.0 / 24.0   # 24 fps logging
+# Log file format, chosen when the log is opened (setup_csv_logging):
+#   "csv"    - one text row per frame
+#   "binary" - one JSON header line describing the columns, then one fixed-size
+#              little-endian record per frame (see FrameLayout); loads with a
+#              single numpy.fromfile (log_tools.load_log)
+#   "both"   - write both files side by side
+LOG_FORMAT = "csv"
+# Frames are queued for a dedicated log writer thread, which writes them in
+# batches (one write per file per batch), so a slow disk never holds up the
+# control path. When the queue is full, LOG_QUEUE_POLICY decides:
+#   "drop_newest" - the new frame is dropped
+#   "drop_oldest" - the oldest queued frame is dropped to make room
+LOG_QUEUE_FRAMES = 256        # queue capacity (frames; ~10 s at 24 fps)
+LOG_BATCH_FRAMES = 24         # write as soon as this many frames are queued...
+LOG_FLUSH_INTERVAL = 1.0      # ...or at least this often (s)
+LOG_QUEUE_POLICY = "drop_newest"
+# Compression and rotation, both done by the log writer thread.
+# LOG_COMPRESSION streams every log file through "gzip" (.gz) or "lzma" (.xz);
+# None writes plain files. With LOG_ROTATE_BYTES (uncompressed bytes per
+# segment) and/or LOG_ROTATE_SECONDS set, each log is split into numbered
+# segments (johnbot2_<start>_000.csv, _001, ...), and a manifest next to them
+# (johnbot2_<start>.csv.manifest.json) lists the segments in order; it is
+# rewritten at every rotation. log_tools reads a manifest like a single log.
+LOG_COMPRESSION = None
+LOG_COMPRESSION_LEVEL = 6     # gzip compresslevel (1-9) / lzma preset (0-9)
+LOG_ROTATE_BYTES = None
+LOG_ROTATE_SECONDS = None
+# Optional raw event log. Frames only hold each robot's latest values, so
+# readings that arrive between two frames never reach the frame log. With
+# EVENT_LOG, every /sensor reading received (coalesced ones included) and
+# every /motor sent is also appended to johnbot2_<start>.events (with
+# INGEST_WORKERS, only johnbot2_<start>_w<k>.events, one per worker; the stop
+# signals sent at shutdown are then not logged) as a 20-byte record with a
+# time.monotonic_ns() timestamp. Records are packed into buffers of
+# EVENT_LOG_BATCH events, written by an event writer thread one buffer per
+# write(); while all EVENT_LOG_BUFFERS are waiting for the disk, events are
+# dropped and counted. LOG_COMPRESSION applies; event logs are not rotated.
+# Cost: about 0.7 us per event, two per handled packet, i.e. roughly +30% on
+# the /sensor handler (`python bench.py events`).
+EVENT_LOG = False
+EVENT_LOG_BATCH = 4096        # events per buffer (80 KiB)
+EVENT_LOG_BUFFERS = 8
+STATS_INTERVAL = 10.0         # seconds between ingest throughput/CPU reports
 
 # Optional: constant LED color (e.g., to reflect the "robot LED level" condition)
 LED_ENABLED = False
 LED_COLOR = (0, 0, 0)        # (R, G, B), all 0 = off
+LED_KEEPALIVE_INTERVAL = 1.0  # /LED is sent only on change, plus this often as keepalive (s)
+
+# Optional: skip /motor when the computed (ML, MR) pair is unchanged, resending
+# it at least every MOTOR_KEEPALIVE_INTERVAL seconds
+MOTOR_SUPPRESS_UNCHANGED = False
+MOTOR_KEEPALIVE_INTERVAL = 0.5
 
 # -----------------------------------------------------------------------------
 # Global state
@@ -59,24 +230,87 @@ logger = logging.getLogger("johnbot2")
 
 running = True
 
-# Per-robot state (latest sensor/motor values and last update time)
-robot_states = {
-    i: {"sensors": (0.0, 0.0), "motors": (0, 0), "last_update": 0.0}
-    for i in range(NUM_ROBOTS)
-}
+def new_robot_states(num_robots: int) -> dict:
+    """
+    Per-robot state (latest sensor/motor values, last update time, packets handled).
+    """
+    return {
+        i: {"sensors": (0.0, 0.0), "motors": (0, 0), "last_update": 0.0, "packets": 0}
+        for i in range(num_robots)
+    }
+
+
+robot_states = new_robot_states(NUM_ROBOTS)
 state_lock = threading.Lock()
 
-# OSC motor clients (host -> robots)
+# Motor links (host -> robots), one MotorLink per robot
 motor_clients = []
 
-# CSV logging
-csv_file = None
-csv_writer = None
-csv_lock = threading.Lock()
-
-# Buffer for latest per-robot data used when writing frames
-robot_buffer = {}
-last_frame_time = 0.0
+# Threads mode: the sensor servers (threaded ingest), the selector ingest thread
+# and the tick thread, i.e. everything that sends /motor besides shutdown.
+# cleanup() stops them before it sends the stop signals
+sensor_servers = []
+ingest_thread = None
+tick_thread = None
+
+# Selector ingest wakeups (socket readiness events), for datagrams-per-wakeup stats
+ingest_wakeups = 0
+
+# Single-port ingest: robot index by source IP, and datagrams from unknown sources
+robot_index_by_ip = {}
+unknown_source_packets = 0
+unknown_source_ips = set()
+
+# Frame logging: frames are built by frame_builder into frame_queue and
+# written by log_writer's thread
+frame_queue = None
+frame_builder = None
+log_writer = None
+
+# Frame deadlines and jitter of the 24 fps frame loop, created when it starts
+frame_clock = None
+
+# Raw /sensor and /motor events (EVENT_LOG), None when off
+event_log = None
+
+# Motor lookup table for the current (MOTOR_MAX_OUTPUT, SIGMOID_ALPHA), built on demand
+motor_table = None
+
+# Per-robot sensor calibration, None when CALIBRATION_FILE is not set
+sensor_calibration = None
+
+# Per-robot sensor filter, None when SENSOR_FILTER is not set
+sensor_filter = None
+
+# Per-robot latency-compensating predictor, None unless SENSOR_PREDICTION is set
+sensor_predictor = None
+
+# Per-robot motor output shaping, None unless MOTOR_SMOOTHING / MOTOR_SLEW_RATE are set
+motor_shaper = None
+
+# Runtime parameter updates: number of swaps so far and wall time of the last one.
+# params_lock serializes swaps with the readers that must see M_max and alpha together
+param_epoch = 0
+param_swap_time = 0.0
+params_lock = threading.Lock()
+
+# Tick mode: latest reading per robot and its arrival time (time.monotonic()),
+# stored in array('d') for cheap per-packet writes and copied out once per tick.
+# tick_lock keeps each (left, right, time) triple whole between the ingest
+# handlers and the tick (no-op under asyncio, like state_lock)
+tick_left = array("d", bytes(8 * NUM_ROBOTS))
+tick_right = array("d", bytes(8 * NUM_ROBOTS))
+tick_received = array("d", bytes(8 * NUM_ROBOTS))
+tick_lock = threading.Lock()
+
+# Multi-process ingest: worker processes, their stop event, per-worker CPU times,
+# and the latest [param_epoch, M_max, alpha] for the workers to pick up
+# and the shared memory block behind robot_buffer
+ingest_workers = []
+ingest_stop = None
+worker_cpu_times = None
+shared_params = None
+robot_buffer_shm = None
 
 # -----------------------------------------------------------------------------
 # Control law (phototaxis mapping used in the paper)
@@ -89,18 +323,90 @@ def sharp_sigmoid(x: float, alpha: float) -> float:
         σ_α(x) = x^α / (x^α + (1 - x)^α)
 
     with x in [0, 1] and α > 0.
+
+    Evaluated in ratio form, with the smaller of x and 1 - x on top:
+
+        σ_α(x) = 1 / (1 + ((1 - x) / x)^α)       for x >= 1/2
+        σ_α(x) = q / (1 + q),  q = (x / (1 - x))^α   for x < 1/2
+
+    The ratio is at most 1, so its power cannot overflow, and when it
+    underflows the result is the correct limit (0 or 1) instead of 0/0.
+    This stays finite for any α (the direct form fails once both powers
+    underflow, e.g. α ≈ 1100 at x = 1/2).
+
+    For integer α the power is taken by repeated squaring (see int_power()),
+    any other α with pow(); sharp_sigmoid_batch() does the same, so both
+    agree bit for bit.
     """
     if x <= 0.0:
         return 0.0
     if x >= 1.0:
         return 1.0
 
-    xn = x ** alpha
-    yn = (1.0 - x) ** alpha
-    return xn / (xn + yn)
+    y = 1.0 - x
+    ratio = y / x if x >= y else x / y
+
+    n = int(alpha)
+    if n == alpha:
+        q = int_power(ratio, n)
+    else:
+        q = ratio ** alpha
+
+    if x >= y:
+        return 1.0 / (1.0 + q)
+    return q / (1.0 + q)
+
+
+def int_power(x, n: int):
+    """
+    x**n for an integer n >= 0 by binary exponentiation.
+
+    Works on floats and NumPy arrays alike with the same sequence of
+    multiplications, so scalar and batch results agree bit for bit (NumPy's
+    vectorized np.power may differ from libm's pow() in the last bit).
+    """
+    result = 1.0
+    while True:
+        if n & 1:
+            result = result * x
+        n >>= 1
+        if not n:
+            return result
+        x = x * x
+
 
+def sharp_sigmoid_batch(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Vectorized sharp_sigmoid() over an array (same ratio form), with the same
+    clamping at 0 and 1 and the same result for every element.
 
-def map_sensors_to_motors(left_sensor: float, right_sensor: float) -> tuple[int, int]:
+    Integer α goes through the same int_power() as the scalar version. Any
+    other α is raised element-wise with Python's pow(), as in the scalar
+    version, because np.power can differ from it in the last bit.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    xc = np.clip(x, 0.0, 1.0)
+    yc = 1.0 - xc
+    upper = xc >= yc
+
+    n = int(alpha)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore", under="ignore"):
+        ratio = np.where(upper, yc / xc, xc / yc)
+        if n == alpha:
+            q = int_power(ratio, n)
+        else:
+            q = np.fromiter((v ** alpha for v in ratio.ravel().tolist()), np.float64, ratio.size)
+            q = q.reshape(ratio.shape)
+        y = np.where(upper, 1.0 / (1.0 + q), q / (1.0 + q))
+
+    y = np.where(x <= 0.0, 0.0, y)
+    return np.where(x >= 1.0, 1.0, y)
+
+
+def map_sensors_to_motors(left_sensor: float,
+                          right_sensor: float,
+                          motor_max: Optional[float] = None,
+                          alpha: Optional[float] = None) -> tuple[int, int]:
     """
     Map raw light sensor readings (SL, SR) to motor commands (ML, MR)
     using the equations defined in the paper:
@@ -111,8 +417,14 @@ def map_sensors_to_motors(left_sensor: float, right_sensor: float) -> tuple[int,
         ML = M_max * σ_α(r̂_L)
         MR = M_max * σ_α(r̂_R)
 
-    where σ_α is the sharp sigmoid above.
+    where σ_α is the sharp sigmoid above. M_max and α default to
+    MOTOR_MAX_OUTPUT and SIGMOID_ALPHA.
     """
+    if motor_max is None:
+        motor_max = MOTOR_MAX_OUTPUT
+    if alpha is None:
+        alpha = SIGMOID_ALPHA
+
     SL = max(0.0, left_sensor)
     SR = max(0.0, right_sensor)
 
@@ -120,321 +432,3364 @@ def map_sensors_to_motors(left_sensor: float, right_sensor: float) -> tuple[int,
     r_hat_L = (SR + 1.0) / denom
     r_hat_R = (SL + 1.0) / denom
 
-    y_L = sharp_sigmoid(r_hat_L, SIGMOID_ALPHA)
-    y_R = sharp_sigmoid(r_hat_R, SIGMOID_ALPHA)
+    y_L = sharp_sigmoid(r_hat_L, alpha)
+    y_R = sharp_sigmoid(r_hat_R, alpha)
 
-    ML = int(round(MOTOR_MAX_OUTPUT * y_L))
-    MR = int(round(MOTOR_MAX_OUTPUT * y_R))
+    ML = int(round(motor_max * y_L))
+    MR = int(round(motor_max * y_R))
 
     return ML, MR
 
-# -----------------------------------------------------------------------------
-# CSV logging
-# -----------------------------------------------------------------------------
 
-def setup_csv_logging() -> None:
+def map_sensors_to_motors_batch(left_sensors,
+                                right_sensors,
+                                motor_max: Optional[float] = None,
+                                alpha: Optional[float] = None) -> tuple[np.ndarray, np.ndarray]:
     """
-    Create a CSV file and writer.
+    Vectorized map_sensors_to_motors() over arrays of readings (e.g. one entry
+    per robot for a control tick, or a whole log column).
 
-    The CSV has:
-        - one row per time frame (24 fps),
-        - columns: timestamp, and for each robot:
-          sensor_left, sensor_right, motor_left, motor_right.
+    Uses the same clamping and round-half-to-even rounding as the scalar
+    version and returns int64 arrays (ML, MR) equal to it element for element.
     """
-    global csv_file, csv_writer
+    if motor_max is None:
+        motor_max = MOTOR_MAX_OUTPUT
+    if alpha is None:
+        alpha = SIGMOID_ALPHA
 
-    os.makedirs(LOG_DIR, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.join(LOG_DIR, f"johnbot2_{timestamp}.csv")
-
-    csv_file = open(filename, "w", newline="")
-    csv_writer = csv.writer(csv_file)
-
-    header = ["timestamp"]
-    for i in range(NUM_ROBOTS):
-        header.extend(
-            [
-                f"robot{i}_sensor_left",
-                f"robot{i}_sensor_right",
-                f"robot{i}_motor_left",
-                f"robot{i}_motor_right",
-            ]
-        )
-    csv_writer.writerow(header)
-    logger.info(f"CSV log file created: {filename}")
+    # fmax, like max(0.0, x), maps NaN to 0.0
+    SL = np.fmax(0.0, np.asarray(left_sensors, dtype=np.float64))
+    SR = np.fmax(0.0, np.asarray(right_sensors, dtype=np.float64))
 
+    denom = SL + SR + 2.0
+    r_hat_L = (SR + 1.0) / denom
+    r_hat_R = (SL + 1.0) / denom
 
-def log_data_to_buffer(robot_id: int,
-                       left_sensor: float,
-                       right_sensor: float,
-                       left_motor: int,
-                       right_motor: int) -> None:
+    y_L = sharp_sigmoid_batch(r_hat_L, alpha)
+    y_R = sharp_sigmoid_batch(r_hat_R, alpha)
+
+    ML = np.rint(motor_max * y_L).astype(np.int64)
+    MR = np.rint(motor_max * y_R).astype(np.int64)
+
+    return ML, MR
+
+
+class MotorTable:
     """
-    Store the latest data for a robot in a buffer.
-    The logging thread will periodically flush this buffer to CSV at 24 fps.
-    """
-    robot_buffer[robot_id] = {
-        "timestamp": time.time(),
-        "sensor_left": left_sensor,
-        "sensor_right": right_sensor,
-        "motor_left": left_motor,
-        "motor_right": right_motor,
-    }
+    map_sensors_to_motors() precomputed for every integer pair (SL, SR) in
+    0..SENSOR_MAX_VALUE, for one (M_max, α).
 
+    The firmware only ever sends integers 0..255, so the 65,536 possible
+    readings are looked up by index (SL * 256 + SR) instead of recomputed.
+    The table is filled with map_sensors_to_motors_batch(), which gives the
+    same values as the scalar law in a few milliseconds.
+    """
 
-def write_frame_to_csv() -> None:
+    def __init__(self, motor_max: float, alpha: float) -> None:
+        self.motor_max = motor_max
+        self.alpha = alpha
+
+        n = self.stride = SENSOR_MAX_VALUE + 1
+        values = np.arange(n, dtype=np.float64)
+        ML, MR = map_sensors_to_motors_batch(np.repeat(values, n), np.tile(values, n),
+                                             motor_max, alpha)
+        self.left = array("i", ML.astype(np.int32).tobytes())
+        self.right = array("i", MR.astype(np.int32).tobytes())
+
+    def lookup(self, left_sensor: float, right_sensor: float) -> tuple[int, int]:
+        """
+        (ML, MR) for one reading from the table, or from the exact formula
+        with this table's parameters for readings outside it.
+        """
+        if 0.0 <= left_sensor <= SENSOR_MAX_VALUE and 0.0 <= right_sensor <= SENSOR_MAX_VALUE:
+            sl = int(left_sensor)
+            sr = int(right_sensor)
+            if sl == left_sensor and sr == right_sensor:
+                index = sl * self.stride + sr
+                return self.left[index], self.right[index]
+
+        return map_sensors_to_motors(left_sensor, right_sensor, self.motor_max, self.alpha)
+
+
+def rebuild_motor_table() -> MotorTable:
     """
-    Write one frame of data for all robots to the CSV file, at 24 fps.
-    If a robot has not sent a recent update, zeros are written for that robot.
+    Build the lookup table for the current MOTOR_MAX_OUTPUT / SIGMOID_ALPHA and
+    install it with a single assignment.
     """
-    global last_frame_time
+    global motor_table
 
-    if csv_writer is None or csv_file is None:
-        return
+    start = time.perf_counter()
+    table = MotorTable(MOTOR_MAX_OUTPUT, SIGMOID_ALPHA)
+    motor_table = table
+    logger.info(
+        f"Motor lookup table built for M_max={table.motor_max}, alpha={table.alpha} "
+        f"in {1000.0 * (time.perf_counter() - start):.0f} ms"
+    )
+    return table
 
-    current_time = time.time()
 
-    # Only write a new frame if enough time has passed
-    if current_time - last_frame_time < FRAME_INTERVAL:
-        return
+def lookup_motors(left_sensor: float, right_sensor: float) -> tuple[int, int]:
+    """
+    Same result as map_sensors_to_motors(), from the lookup table when both
+    readings are integers in 0..SENSOR_MAX_VALUE.
 
-    frame_time = last_frame_time + FRAME_INTERVAL
-    while frame_time <= current_time:
-        with csv_lock:
-            row = [frame_time]
-            for robot_id in range(NUM_ROBOTS):
-                data = robot_buffer.get(robot_id)
-                if data is None or (current_time - data["timestamp"] > 0.5):
-                    # No recent data: write zeros
-                    row.extend([0.0, 0.0, 0, 0])
-                else:
-                    row.extend(
-                        [
-                            data["sensor_left"],
-                            data["sensor_right"],
-                            data["motor_left"],
-                            data["motor_right"],
-                        ]
-                    )
+    Non-integer, negative or out-of-range readings fall back to the exact
+    formula. If MOTOR_MAX_OUTPUT or SIGMOID_ALPHA no longer match the table,
+    it is rebuilt first.
+    """
+    if not MOTOR_LOOKUP_TABLE:
+        return map_sensors_to_motors(left_sensor, right_sensor)
+
+    table = motor_table
+    if (table is None or table.motor_max != MOTOR_MAX_OUTPUT
+            or table.alpha != SIGMOID_ALPHA):
+        # Either the constants were changed, or apply_control_params() is
+        # swapping right now: wait for it and check again
+        with params_lock:
+            table = motor_table
+            if (table is None or table.motor_max != MOTOR_MAX_OUTPUT
+                    or table.alpha != SIGMOID_ALPHA):
+                table = rebuild_motor_table()
+
+    return table.lookup(left_sensor, right_sensor)
 
-            csv_writer.writerow(row)
+# -----------------------------------------------------------------------------
+# Sensor calibration
+# -----------------------------------------------------------------------------
 
-            # Flush occasionally to avoid data loss
-            frame_index = int(frame_time * 24)
-            if frame_index % 10 == 0:
-                csv_file.flush()
+class SensorCalibration:
+    """
+    Per-robot, per-side linear calibration of the phototransistor readings:
 
-        frame_time += FRAME_INTERVAL
+        calibrated = gain * raw + offset
 
-    last_frame_time = frame_time - FRAME_INTERVAL
+    rounded to integers when CALIBRATION_ROUND is set. Coefficients are kept
+    in array('d') for per-packet indexing; apply_batch() reads them through
+    NumPy views and gives the same values as apply() element for element.
+    """
 
+    def __init__(self, num_robots: int) -> None:
+        self.left_gain = array("d", [1.0]) * num_robots
+        self.left_offset = array("d", [0.0]) * num_robots
+        self.right_gain = array("d", [1.0]) * num_robots
+        self.right_offset = array("d", [0.0]) * num_robots
+
+    def set(self, robot_id: int, left_gain: float, left_offset: float,
+            right_gain: float, right_offset: float) -> None:
+        self.left_gain[robot_id] = left_gain
+        self.left_offset[robot_id] = left_offset
+        self.right_gain[robot_id] = right_gain
+        self.right_offset[robot_id] = right_offset
+
+    def apply(self, robot_id: int, left_sensor: float, right_sensor: float) -> tuple[float, float]:
+        left = self.left_gain[robot_id] * left_sensor + self.left_offset[robot_id]
+        right = self.right_gain[robot_id] * right_sensor + self.right_offset[robot_id]
+        if CALIBRATION_ROUND:
+            return float(round(left)), float(round(right))
+        return left, right
+
+    def apply_batch(self, robot_ids, left_sensors, right_sensors) -> tuple[np.ndarray, np.ndarray]:
+        ids = np.asarray(robot_ids, dtype=np.intp)
+        left = (np.frombuffer(self.left_gain, dtype=np.float64)[ids] * left_sensors
+                + np.frombuffer(self.left_offset, dtype=np.float64)[ids])
+        right = (np.frombuffer(self.right_gain, dtype=np.float64)[ids] * right_sensors
+                 + np.frombuffer(self.right_offset, dtype=np.float64)[ids])
+        if CALIBRATION_ROUND:
+            return np.rint(left), np.rint(right)
+        return left, right
+
+
+def load_calibration(path: str, num_robots: int) -> SensorCalibration:
+    """
+    Read a calibration CSV with a header and
+    "robot_id,left_gain,left_offset,right_gain,right_offset" rows.
+    Robots not listed keep gain 1 and offset 0.
+    """
+    calibration = SensorCalibration(num_robots)
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            robot_id = int(row["robot_id"])
+            if not 0 <= robot_id < num_robots:
+                raise ValueError(f"{path}: robot_id {robot_id} outside 0..{num_robots - 1}")
+            coefficients = [
+                float(row[field])
+                for field in ("left_gain", "left_offset", "right_gain", "right_offset")
+            ]
+            if not all(math.isfinite(value) for value in coefficients):
+                raise ValueError(f"{path}: non-finite coefficient for robot {robot_id}")
+            calibration.set(robot_id, *coefficients)
+    return calibration
 
-def csv_logging_thread() -> None:
+
+def setup_calibration() -> None:
     """
-    Background thread that calls write_frame_to_csv() at 24 fps.
+    Load CALIBRATION_FILE, if set, into sensor_calibration.
     """
-    global last_frame_time
-    last_frame_time = time.time()
+    global sensor_calibration
 
-    while running:
-        write_frame_to_csv()
-        time.sleep(FRAME_INTERVAL / 2.0)
+    if CALIBRATION_FILE:
+        sensor_calibration = load_calibration(CALIBRATION_FILE, NUM_ROBOTS)
+        logger.info(f"Sensor calibration loaded from {CALIBRATION_FILE}")
 
 # -----------------------------------------------------------------------------
-# OSC handling
+# Sensor filtering
 # -----------------------------------------------------------------------------
 
-def osc_sensor_handler(robot_id: int, addr: str, *args) -> None:
+class SensorFilter(ABC):
     """
-    OSC handler for /sensor messages.
+    Per-robot filter over both sensors, with all state in arrays allocated
+    once for the whole swarm (array('d') for per-packet indexing, NumPy views
+    of the same memory for batches).
 
-    Expected message:
-        /sensor <float:left_sensor> <float:right_sensor>
+    update() pushes one reading per packet in O(1). update_batch() does the
+    same for many robots at once (tick mode); a robot's reading is pushed only
+    if it is newer than the last one pushed, so the filter always runs on the
+    robot's own sample stream. A robot silent for FILTER_RESET_AFTER seconds
+    starts over from its next reading.
+
+    Subclasses implement push() and push_batch().
     """
-    if len(args) != 2:
-        logger.warning(
-            f"Robot {robot_id}: invalid /sensor message, expected 2 values, got {len(args)}"
+
+    def __init__(self, num_robots: int) -> None:
+        self.last_time = array("d", bytes(8 * num_robots))
+        self.left = array("d", bytes(8 * num_robots))
+        self.right = array("d", bytes(8 * num_robots))
+
+    def update(self, robot_id: int, left_sensor: float, right_sensor: float,
+               now: float) -> tuple[float, float]:
+        restart = now - self.last_time[robot_id] > FILTER_RESET_AFTER
+        left, right = self.push(robot_id, left_sensor, right_sensor, now, restart)
+        self.left[robot_id] = left
+        self.right[robot_id] = right
+        self.last_time[robot_id] = now
+        return left, right
+
+    def update_batch(self, robot_ids: np.ndarray, left_sensors, right_sensors,
+                     times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        last_time = np.frombuffer(self.last_time, dtype=np.float64)
+        new = times > last_time[robot_ids]
+        if new.any():
+            ids = robot_ids[new]
+            restart = times[new] - last_time[ids] > FILTER_RESET_AFTER
+            left, right = self.push_batch(
+                ids, np.asarray(left_sensors)[new], np.asarray(right_sensors)[new],
+                times[new], restart,
+            )
+            np.frombuffer(self.left, dtype=np.float64)[ids] = left
+            np.frombuffer(self.right, dtype=np.float64)[ids] = right
+            last_time[ids] = times[new]
+        return (np.frombuffer(self.left, dtype=np.float64)[robot_ids],
+                np.frombuffer(self.right, dtype=np.float64)[robot_ids])
+
+    @abstractmethod
+    def push(self, robot_id, left_sensor, right_sensor, now, restart):
+        """
+        Add one reading of a robot (restarting its state if `restart`) and
+        return the filtered (left, right).
+        """
+
+    @abstractmethod
+    def push_batch(self, robot_ids, left_sensors, right_sensors, times, restart):
+        """
+        push() for many robots at once (arrays); returns (left, right) arrays.
+        """
+
+
+def ema_step(previous, value, weight):
+    """
+    One exponential moving average step (floats or arrays).
+    """
+    return previous + weight * (value - previous)
+
+
+class EmaFilter(SensorFilter):
+    """
+    Exponential moving average with weight FILTER_EMA_WEIGHT on the newest reading.
+    """
+
+    def push(self, robot_id, left_sensor, right_sensor, now, restart):
+        if restart:
+            return left_sensor, right_sensor
+        return (ema_step(self.left[robot_id], left_sensor, FILTER_EMA_WEIGHT),
+                ema_step(self.right[robot_id], right_sensor, FILTER_EMA_WEIGHT))
+
+    def push_batch(self, robot_ids, left_sensors, right_sensors, times, restart):
+        left = ema_step(np.frombuffer(self.left, dtype=np.float64)[robot_ids],
+                        left_sensors, FILTER_EMA_WEIGHT)
+        right = ema_step(np.frombuffer(self.right, dtype=np.float64)[robot_ids],
+                         right_sensors, FILTER_EMA_WEIGHT)
+        return np.where(restart, left_sensors, left), np.where(restart, right_sensors, right)
+
+
+class MedianFilter(SensorFilter):
+    """
+    Moving median over the last FILTER_WINDOW readings, kept in one ring
+    buffer row per robot and side (unused slots hold NaN until the row fills).
+
+    Next to each ring row, a row of the same readings is kept in sorted order
+    (NaN last, as np.sort does). A packet removes the reading that leaves the
+    window and inserts the new one by shifting within that row, so push()
+    works in place in O(FILTER_WINDOW) without sorting or allocating a buffer.
+    """
+
+    def __init__(self, num_robots: int) -> None:
+        super().__init__(num_robots)
+        self.window = FILTER_WINDOW
+        self.left_ring = array("d", [math.nan]) * (num_robots * self.window)
+        self.right_ring = array("d", [math.nan]) * (num_robots * self.window)
+        self.left_sorted = array("d", [math.nan]) * (num_robots * self.window)
+        self.right_sorted = array("d", [math.nan]) * (num_robots * self.window)
+        self.position = array("i", bytes(4 * num_robots))
+        self.count = array("i", bytes(4 * num_robots))
+
+    @staticmethod
+    def slide(row: array, base: int, count: int, old: Optional[float], new: float) -> None:
+        """
+        Update the sorted readings row[base:base + count]: remove `old` (None
+        while the window is still filling, when a free slot follows them) and
+        insert `new`, shifting the readings in between by one slot.
+        """
+        end = base + count
+        # bisect_left treats NaN as larger than any reading, matching NaN last
+        target = bisect_left(row, new, base, end) if new == new else end
+        if old is None:
+            for index in range(end, target, -1):
+                row[index] = row[index - 1]
+            row[target] = new
+            return
+
+        source = bisect_left(row, old, base, end) if old == old else end - 1
+        if target > source:
+            for index in range(source, target - 1):
+                row[index] = row[index + 1]
+            row[target - 1] = new
+        else:
+            for index in range(source, target, -1):
+                row[index] = row[index - 1]
+            row[target] = new
+
+    @staticmethod
+    def median(row: array, base: int, count: int) -> float:
+        middle = base + count // 2
+        if count % 2:
+            return row[middle]
+        return (row[middle - 1] + row[middle]) / 2.0
+
+    def push(self, robot_id, left_sensor, right_sensor, now, restart):
+        window = self.window
+        base = robot_id * window
+        if restart:
+            self.position[robot_id] = 0
+            self.count[robot_id] = 0
+            for slot in range(base, base + window):
+                self.left_ring[slot] = math.nan
+                self.right_ring[slot] = math.nan
+                self.left_sorted[slot] = math.nan
+                self.right_sorted[slot] = math.nan
+
+        position = self.position[robot_id]
+        count = self.count[robot_id]
+        slot = base + position
+        if count == window:
+            # The reading in this slot leaves the window
+            self.slide(self.left_sorted, base, count, self.left_ring[slot], left_sensor)
+            self.slide(self.right_sorted, base, count, self.right_ring[slot], right_sensor)
+        else:
+            self.slide(self.left_sorted, base, count, None, left_sensor)
+            self.slide(self.right_sorted, base, count, None, right_sensor)
+            count += 1
+
+        self.left_ring[slot] = left_sensor
+        self.right_ring[slot] = right_sensor
+        self.position[robot_id] = (position + 1) % window
+        self.count[robot_id] = count
+
+        return (self.median(self.left_sorted, base, count),
+                self.median(self.right_sorted, base, count))
+
+    def push_batch(self, robot_ids, left_sensors, right_sensors, times, restart):
+        window = self.window
+        left_ring = np.frombuffer(self.left_ring, dtype=np.float64).reshape(-1, window)
+        right_ring = np.frombuffer(self.right_ring, dtype=np.float64).reshape(-1, window)
+        position = np.frombuffer(self.position, dtype=np.int32)
+        count = np.frombuffer(self.count, dtype=np.int32)
+
+        reset = robot_ids[restart]
+        left_ring[reset] = math.nan
+        right_ring[reset] = math.nan
+        position[reset] = 0
+        count[reset] = 0
+
+        slots = position[robot_ids]
+        left_ring[robot_ids, slots] = left_sensors
+        right_ring[robot_ids, slots] = right_sensors
+        position[robot_ids] = (slots + 1) % window
+        count[robot_ids] = np.minimum(count[robot_ids] + 1, window)
+
+        # NaN (unused) slots sort last; pick the middle of the `count` readings
+        counts = count[robot_ids]
+        rows = np.arange(robot_ids.size)
+        low = (counts - 1) // 2
+        high = counts // 2
+        left_sorted = np.sort(left_ring[robot_ids], axis=1)
+        right_sorted = np.sort(right_ring[robot_ids], axis=1)
+        # Keep the sorted rows of push() in step
+        np.frombuffer(self.left_sorted, dtype=np.float64).reshape(-1, window)[robot_ids] = left_sorted
+        np.frombuffer(self.right_sorted, dtype=np.float64).reshape(-1, window)[robot_ids] = right_sorted
+        return ((left_sorted[rows, low] + left_sorted[rows, high]) / 2.0,
+                (right_sorted[rows, low] + right_sorted[rows, high]) / 2.0)
+
+
+def smoothing_factor(dt, cutoff):
+    """
+    Exponential smoothing factor for a low-pass of `cutoff` Hz over `dt` seconds.
+    """
+    r = 2.0 * math.pi * cutoff * dt
+    return r / (r + 1.0)
+
+
+def one_euro_step(previous, derivative, value, dt):
+    """
+    One one-euro filter step (floats or arrays): returns the new value and
+    the new smoothed derivative. The cutoff rises with the speed of change,
+    so slow drifts are smoothed hard while fast turns pass with little lag.
+    """
+    new_derivative = ema_step(derivative, (value - previous) / dt,
+                              smoothing_factor(dt, FILTER_D_CUTOFF))
+    cutoff = FILTER_MIN_CUTOFF + FILTER_BETA * abs(new_derivative)
+    return ema_step(previous, value, smoothing_factor(dt, cutoff)), new_derivative
+
+
+class OneEuroFilter(SensorFilter):
+    """
+    One-euro filter (Casiez et al., CHI 2012) on the readings' arrival times.
+    """
+
+    def __init__(self, num_robots: int) -> None:
+        super().__init__(num_robots)
+        self.left_derivative = array("d", bytes(8 * num_robots))
+        self.right_derivative = array("d", bytes(8 * num_robots))
+
+    def push(self, robot_id, left_sensor, right_sensor, now, restart):
+        if restart:
+            self.left_derivative[robot_id] = 0.0
+            self.right_derivative[robot_id] = 0.0
+            return left_sensor, right_sensor
+
+        dt = max(now - self.last_time[robot_id], 1e-6)
+        left, self.left_derivative[robot_id] = one_euro_step(
+            self.left[robot_id], self.left_derivative[robot_id], left_sensor, dt
         )
-        return
+        right, self.right_derivative[robot_id] = one_euro_step(
+            self.right[robot_id], self.right_derivative[robot_id], right_sensor, dt
+        )
+        return left, right
 
-    try:
-        left_sensor = float(args[0])
-        right_sensor = float(args[1])
-    except ValueError:
-        logger.warning(
-            f"Robot {robot_id}: could not parse sensor values: {args}"
+    def push_batch(self, robot_ids, left_sensors, right_sensors, times, restart):
+        left_derivative = np.frombuffer(self.left_derivative, dtype=np.float64)
+        right_derivative = np.frombuffer(self.right_derivative, dtype=np.float64)
+
+        dt = np.maximum(times - np.frombuffer(self.last_time, dtype=np.float64)[robot_ids], 1e-6)
+        left, new_left_derivative = one_euro_step(
+            np.frombuffer(self.left, dtype=np.float64)[robot_ids],
+            left_derivative[robot_ids], left_sensors, dt,
+        )
+        right, new_right_derivative = one_euro_step(
+            np.frombuffer(self.right, dtype=np.float64)[robot_ids],
+            right_derivative[robot_ids], right_sensors, dt,
         )
-        return
 
-    # Compute motor commands
-    left_motor, right_motor = map_sensors_to_motors(left_sensor, right_sensor)
+        left_derivative[robot_ids] = np.where(restart, 0.0, new_left_derivative)
+        right_derivative[robot_ids] = np.where(restart, 0.0, new_right_derivative)
+        return np.where(restart, left_sensors, left), np.where(restart, right_sensors, right)
 
-    with state_lock:
-        robot_states[robot_id]["sensors"] = (left_sensor, right_sensor)
-        robot_states[robot_id]["motors"] = (left_motor, right_motor)
-        robot_states[robot_id]["last_update"] = time.time()
 
-    # Log to buffer for CSV
-    log_data_to_buffer(
-        robot_id,
-        left_sensor,
-        right_sensor,
-        left_motor,
-        right_motor,
-    )
+SENSOR_FILTERS = {
+    "ema": EmaFilter,
+    "median": MedianFilter,
+    "one_euro": OneEuroFilter,
+}
 
-    # Send commands to the robot
-    if 0 <= robot_id < len(motor_clients):
-        client = motor_clients[robot_id]
-        try:
-            client.send_message("/motor", [left_motor, right_motor])
-            if LED_ENABLED:
-                client.send_message("/LED", list(LED_COLOR))
-        except Exception as e:
-            logger.error(f"Robot {robot_id}: failed to send OSC command: {e}")
-    else:
-        logger.error(
-            f"Robot {robot_id}: no motor client configured (len={len(motor_clients)})"
-        )
 
+def setup_sensor_filter(num_robots: int) -> None:
+    """
+    Create sensor_filter for SENSOR_FILTER (None: no filtering).
+    """
+    global sensor_filter
+
+    if not SENSOR_FILTER:
+        sensor_filter = None
+        return
+    if SENSOR_FILTER not in SENSOR_FILTERS:
+        raise ValueError(f"Unknown SENSOR_FILTER {SENSOR_FILTER!r}, expected one of {list(SENSOR_FILTERS)}")
+    sensor_filter = SENSOR_FILTERS[SENSOR_FILTER](num_robots)
+    logger.info(f"Sensor filter: {SENSOR_FILTER}")
 
-def setup_sensor_servers():
+# -----------------------------------------------------------------------------
+# Latency-compensating prediction
+# -----------------------------------------------------------------------------
+
+def alpha_beta_step(value, rate, reading, dt):
     """
-    Create one OSC UDP server per robot for incoming /sensor messages.
+    One alpha-beta filter step (floats or arrays): predict over dt, then
+    correct value and rate of change by the residual.
     """
-    servers = []
+    predicted = value + rate * dt
+    residual = reading - predicted
+    return (predicted + PREDICTION_ALPHA * residual,
+            rate + (PREDICTION_BETA / dt) * residual)
 
-    for robot_id in range(NUM_ROBOTS):
-        port = SENSOR_BASE_PORT + robot_id
 
-        disp = dispatcher.Dispatcher()
-        from functools import partial
+class SensorPredictor:
+    """
+    Per-robot alpha-beta tracker of both readings, extrapolated to the
+    expected actuation time (see SENSOR_PREDICTION).
+
+    O(1) state per robot in array('d'): value and rate per side, the arrival
+    time of the last reading, and an average of the robot's packet interval.
+    update_batch() / predict_batch() are the tick-mode forms; a robot's
+    reading is only pushed if it is newer than the last one pushed. A robot
+    silent for FILTER_RESET_AFTER seconds starts over with rate 0.
+    """
 
-        handler = partial(osc_sensor_handler, robot_id)
-        disp.map("/sensor", handler)
+    INTERVAL_WEIGHT = 0.1
+
+    def __init__(self, num_robots: int) -> None:
+        self.left = array("d", bytes(8 * num_robots))
+        self.left_rate = array("d", bytes(8 * num_robots))
+        self.right = array("d", bytes(8 * num_robots))
+        self.right_rate = array("d", bytes(8 * num_robots))
+        self.last_time = array("d", bytes(8 * num_robots))
+        self.interval = array("d", bytes(8 * num_robots))
+
+    def update(self, robot_id: int, left_sensor: float, right_sensor: float, arrival: float) -> None:
+        dt = arrival - self.last_time[robot_id]
+        self.last_time[robot_id] = arrival
+
+        if dt > FILTER_RESET_AFTER or dt <= 0.0:
+            self.left[robot_id] = left_sensor
+            self.right[robot_id] = right_sensor
+            self.left_rate[robot_id] = 0.0
+            self.right_rate[robot_id] = 0.0
+            return
+
+        self.left[robot_id], self.left_rate[robot_id] = alpha_beta_step(
+            self.left[robot_id], self.left_rate[robot_id], left_sensor, dt
+        )
+        self.right[robot_id], self.right_rate[robot_id] = alpha_beta_step(
+            self.right[robot_id], self.right_rate[robot_id], right_sensor, dt
+        )
+        interval = self.interval[robot_id]
+        self.interval[robot_id] = dt if interval == 0.0 else ema_step(interval, dt, self.INTERVAL_WEIGHT)
+
+    def horizon(self, robot_id: int, now: float, hold: Optional[float] = None) -> float:
+        if hold is None:
+            hold = self.interval[robot_id]
+        age = now - self.last_time[robot_id]
+        return min(age + PREDICTION_LATENCY + 0.5 * hold, PREDICTION_MAX_HORIZON)
+
+    def predict(self, robot_id: int, now: float, hold: Optional[float] = None) -> tuple[float, float]:
+        """
+        Readings extrapolated to the expected actuation time of a command sent
+        at `now` and held for `hold` seconds (default: the robot's packet interval).
+        """
+        horizon = self.horizon(robot_id, now, hold)
+        return (self.left[robot_id] + self.left_rate[robot_id] * horizon,
+                self.right[robot_id] + self.right_rate[robot_id] * horizon)
+
+    def update_batch(self, robot_ids: np.ndarray, left_sensors, right_sensors,
+                     times: np.ndarray) -> None:
+        last_time = np.frombuffer(self.last_time, dtype=np.float64)
+        new = times > last_time[robot_ids]
+        if not new.any():
+            return
+
+        ids = robot_ids[new]
+        t = times[new]
+        left_sensors = np.asarray(left_sensors, dtype=np.float64)[new]
+        right_sensors = np.asarray(right_sensors, dtype=np.float64)[new]
+        dt = t - last_time[ids]
+        restart = dt > FILTER_RESET_AFTER
+        safe_dt = np.where(restart, 1.0, dt)
+
+        left = np.frombuffer(self.left, dtype=np.float64)
+        right = np.frombuffer(self.right, dtype=np.float64)
+        left_rate = np.frombuffer(self.left_rate, dtype=np.float64)
+        right_rate = np.frombuffer(self.right_rate, dtype=np.float64)
+        interval = np.frombuffer(self.interval, dtype=np.float64)
+
+        new_left, new_left_rate = alpha_beta_step(left[ids], left_rate[ids], left_sensors, safe_dt)
+        new_right, new_right_rate = alpha_beta_step(right[ids], right_rate[ids], right_sensors, safe_dt)
+        left[ids] = np.where(restart, left_sensors, new_left)
+        right[ids] = np.where(restart, right_sensors, new_right)
+        left_rate[ids] = np.where(restart, 0.0, new_left_rate)
+        right_rate[ids] = np.where(restart, 0.0, new_right_rate)
+
+        old_interval = interval[ids]
+        averaged = np.where(old_interval == 0.0, dt,
+                            ema_step(old_interval, dt, self.INTERVAL_WEIGHT))
+        interval[ids] = np.where(restart, old_interval, averaged)
+        last_time[ids] = t
+
+    def predict_batch(self, robot_ids: np.ndarray, now: float,
+                      hold: float) -> tuple[np.ndarray, np.ndarray]:
+        age = now - np.frombuffer(self.last_time, dtype=np.float64)[robot_ids]
+        horizon = np.minimum(age + PREDICTION_LATENCY + 0.5 * hold, PREDICTION_MAX_HORIZON)
+        return (np.frombuffer(self.left, dtype=np.float64)[robot_ids]
+                + np.frombuffer(self.left_rate, dtype=np.float64)[robot_ids] * horizon,
+                np.frombuffer(self.right, dtype=np.float64)[robot_ids]
+                + np.frombuffer(self.right_rate, dtype=np.float64)[robot_ids] * horizon)
+
+
+def setup_sensor_predictor(num_robots: int) -> None:
+    """
+    Create sensor_predictor if SENSOR_PREDICTION is set.
+    """
+    global sensor_predictor
 
-        server = osc_server.ThreadingOSCUDPServer(("0.0.0.0", port), disp)
-        thread = threading.Thread(target=server.serve_forever, daemon=True)
-        thread.start()
+    if not SENSOR_PREDICTION:
+        sensor_predictor = None
+        return
+    sensor_predictor = SensorPredictor(num_robots)
+    logger.info(
+        f"Latency compensation: alpha-beta ({PREDICTION_ALPHA}, {PREDICTION_BETA}), "
+        f"{1000.0 * PREDICTION_LATENCY:.0f} ms network latency"
+    )
 
-        servers.append(server)
-        logger.info(f"Listening for robot {robot_id} sensors on UDP port {port}")
+# -----------------------------------------------------------------------------
+# Motor output shaping
+# -----------------------------------------------------------------------------
 
-    return servers
+def motor_shaping_enabled() -> bool:
+    return MOTOR_SMOOTHING != 1.0 or MOTOR_SLEW_RATE is not None
 
 
-def setup_motor_clients():
+class MotorShaper:
     """
-    Create one OSC UDP client per robot for outgoing /motor (and optional /LED) messages.
+    Per-robot smoothing and slew-rate limit of the control law's (ML, MR).
+
+    Each step first moves the applied value toward the request by
+    MOTOR_SMOOTHING, then caps the change at MOTOR_SLEW_RATE * dt, where dt
+    is the time since the robot's previous command (at most
+    MOTOR_SLEW_MAX_DT, since the motors kept the last value meanwhile); the
+    result is rounded
+    for sending. The unrounded applied values and the time of each robot's
+    last command are kept in array('d'); update_batch() runs the same step
+    with NumPy views for a tick and gives the same values as update().
+    Every robot starts from motors stopped (0, 0).
     """
-    clients = []
-    for robot_id in range(NUM_ROBOTS):
-        ip = ROBOT_IP_TEMPLATE.format(50 + robot_id)
-        port = MOTOR_BASE_PORT + robot_id
-        client = udp_client.SimpleUDPClient(ip, port)
-        clients.append(client)
-        logger.info(f"Motor client for robot {robot_id}: IP={ip}, port={port}")
-    return clients
+
+    def __init__(self, num_robots: int) -> None:
+        self.left = array("d", bytes(8 * num_robots))
+        self.right = array("d", bytes(8 * num_robots))
+        self.last_time = array("d", bytes(8 * num_robots))
+
+    def update(self, robot_id: int, left_motor: int, right_motor: int, now: float) -> tuple[int, int]:
+        dt = min(now - self.last_time[robot_id], MOTOR_SLEW_MAX_DT)
+        self.last_time[robot_id] = now
+
+        left = self.left[robot_id]
+        right = self.right[robot_id]
+        left_target = left + MOTOR_SMOOTHING * (left_motor - left)
+        right_target = right + MOTOR_SMOOTHING * (right_motor - right)
+        if MOTOR_SLEW_RATE is not None:
+            step = MOTOR_SLEW_RATE * dt
+            left_target = min(max(left_target, left - step), left + step)
+            right_target = min(max(right_target, right - step), right + step)
+
+        self.left[robot_id] = left_target
+        self.right[robot_id] = right_target
+        return round(left_target), round(right_target)
+
+    def update_batch(self, robot_ids: np.ndarray, left_motors, right_motors,
+                     now: float) -> tuple[np.ndarray, np.ndarray]:
+        last_time = np.frombuffer(self.last_time, dtype=np.float64)
+        dt = np.minimum(now - last_time[robot_ids], MOTOR_SLEW_MAX_DT)
+        last_time[robot_ids] = now
+
+        applied_left = np.frombuffer(self.left, dtype=np.float64)
+        applied_right = np.frombuffer(self.right, dtype=np.float64)
+        left = applied_left[robot_ids]
+        right = applied_right[robot_ids]
+        left_target = left + MOTOR_SMOOTHING * (left_motors - left)
+        right_target = right + MOTOR_SMOOTHING * (right_motors - right)
+        if MOTOR_SLEW_RATE is not None:
+            step = MOTOR_SLEW_RATE * dt
+            left_target = np.minimum(np.maximum(left_target, left - step), left + step)
+            right_target = np.minimum(np.maximum(right_target, right - step), right + step)
+
+        applied_left[robot_ids] = left_target
+        applied_right[robot_ids] = right_target
+        return (np.rint(left_target).astype(np.int64),
+                np.rint(right_target).astype(np.int64))
+
+
+def setup_motor_shaper(num_robots: int) -> None:
+    """
+    Create motor_shaper if MOTOR_SMOOTHING or MOTOR_SLEW_RATE are set.
+    """
+    global motor_shaper
+
+    if not motor_shaping_enabled():
+        motor_shaper = None
+        return
+    if not 0.0 < MOTOR_SMOOTHING <= 1.0:
+        raise ValueError(f"MOTOR_SMOOTHING must be in (0, 1], got {MOTOR_SMOOTHING}")
+    if MOTOR_SLEW_RATE is not None and MOTOR_SLEW_RATE <= 0.0:
+        raise ValueError(f"MOTOR_SLEW_RATE must be > 0, got {MOTOR_SLEW_RATE}")
+    motor_shaper = MotorShaper(num_robots)
+    logger.info(
+        f"Motor shaping: smoothing {MOTOR_SMOOTHING}, slew rate "
+        f"{'unlimited' if MOTOR_SLEW_RATE is None else f'{MOTOR_SLEW_RATE:g}/s'}"
+    )
 
 # -----------------------------------------------------------------------------
-# Monitoring and shutdown
+# Control law registry
 # -----------------------------------------------------------------------------
 
-def monitor_robot_states() -> None:
+class ControlLaw:
     """
-    Periodically print a warning if a robot has not sent data for several seconds.
+    A named control law in two forms with identical results:
+
+        scalar(left, right) -> (ML, MR)        one reading, per packet
+        batch(lefts, rights) -> (ML, MR)       arrays of readings, per tick or log
     """
-    while running:
-        now = time.time()
-        with state_lock:
-            for robot_id, state in robot_states.items():
-                last_update = state["last_update"]
-                if last_update > 0 and now - last_update > 5.0:
-                    logger.warning(
-                        f"Robot {robot_id} has not sent data for {now - last_update:.1f} seconds"
-                    )
-        time.sleep(1.0)
 
+    def __init__(self,
+                 name: str,
+                 scalar: Callable[[float, float], tuple[int, int]],
+                 batch: Callable[[np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]]) -> None:
+        self.name = name
+        self.scalar = scalar
+        self.batch = batch
 
-def send_stop_signals() -> None:
+
+def swapped_scalar(law: Callable[[float, float], tuple[int, int]]) -> Callable[[float, float], tuple[int, int]]:
     """
-    Send /motor [0, 0] (and /LED [0,0,0]) to all robots a few times to ensure they stop.
+    Scalar law with the two sensors exchanged.
     """
-    logger.info("Sending stop signals to all robots...")
-    for robot_id, client in enumerate(motor_clients):
-        try:
-            for _ in range(3):
-                client.send_message("/motor", [0, 0])
-                if LED_ENABLED:
-                    client.send_message("/LED", [0, 0, 0])
-                time.sleep(0.01)
-            logger.info(f"Stop signal sent to robot {robot_id}")
-        except Exception as e:
-            logger.error(f"Failed to send stop signal to robot {robot_id}: {e}")
+    def scalar(left_sensor: float, right_sensor: float) -> tuple[int, int]:
+        return law(right_sensor, left_sensor)
+    return scalar
 
 
-def cleanup() -> None:
+def swapped_batch(law):
     """
-    Clean shutdown: stop robots and close the CSV file.
+    Batch law with the two sensors exchanged.
     """
-    global running
+    def batch(left_sensors, right_sensors):
+        return law(right_sensors, left_sensors)
+    return batch
 
-    if not running:
-        return
 
-    running = False
-    logger.info("Shutting down controller...")
+def phototaxis_law(name: str,
+                   alpha: Optional[float] = None,
+                   inverted: bool = False,
+                   motor_max: Optional[float] = None) -> ControlLaw:
+    """
+    The paper's phototaxis law, or its inverse (sensors swapped).
 
-    try:
-        send_stop_signals()
-    except Exception:
-        pass
+    With alpha None the law follows MOTOR_MAX_OUTPUT / SIGMOID_ALPHA and the
+    shared lookup table; with a fixed alpha it gets a table of its own, for
+    motor_max (default MOTOR_MAX_OUTPUT).
+    """
+    if alpha is None:
+        scalar = lookup_motors
+        batch = map_sensors_to_motors_batch
+    else:
+        if motor_max is None:
+            motor_max = MOTOR_MAX_OUTPUT
+        batch = partial(map_sensors_to_motors_batch, motor_max=motor_max, alpha=alpha)
+        if MOTOR_LOOKUP_TABLE:
+            scalar = MotorTable(motor_max, alpha).lookup
+        else:
+            scalar = partial(map_sensors_to_motors, motor_max=motor_max, alpha=alpha)
 
-    try:
-        if csv_file is not None:
-            csv_file.flush()
-            csv_file.close()
-            logger.info("CSV log file closed")
-    except Exception as e:
-        logger.error(f"Error while closing CSV file: {e}")
+    if inverted:
+        scalar = swapped_scalar(scalar)
+        batch = swapped_batch(batch)
+    return ControlLaw(name, scalar, batch)
 
-    logger.info("Shutdown complete.")
 
+# Registered laws by name
+control_laws: dict[str, ControlLaw] = {}
 
-def signal_handler(sig, frame) -> None:
+
+def register_control_law(law: ControlLaw) -> ControlLaw:
     """
-    Handle Ctrl+C (SIGINT) to perform a clean shutdown.
+    Add a law to the registry (replacing one with the same name).
     """
-    logger.info("SIGINT received, shutting down...")
-    cleanup()
-    sys.exit(0)
+    control_laws[law.name] = law
+    return law
+
+
+register_control_law(phototaxis_law("phototaxis"))
+register_control_law(phototaxis_law("antiphototaxis", inverted=True))
+
+
+# "<built-in>@<alpha>" law names
+ALPHA_VARIANT_PATTERN = re.compile(r"(phototaxis|antiphototaxis)@([0-9]*\.?[0-9]+)")
+
+
+def alpha_variant_law(name: str, motor_max: Optional[float] = None) -> Optional[ControlLaw]:
+    """
+    Build the "<built-in>@<alpha>" law `name`, or return None if `name` is not one.
+    """
+    match = ALPHA_VARIANT_PATTERN.fullmatch(name)
+    if match is None:
+        return None
+    alpha = float(match.group(2))
+    if alpha <= 0.0:
+        raise ValueError(f"Control law {name!r}: alpha must be > 0")
+    return phototaxis_law(
+        name, alpha, inverted=match.group(1) == "antiphototaxis", motor_max=motor_max
+    )
+
+
+def get_control_law(name: str) -> ControlLaw:
+    """
+    Look up a law by name, creating "<built-in>@<alpha>" variants on first use.
+    """
+    law = control_laws.get(name)
+    if law is not None:
+        return law
+
+    law = alpha_variant_law(name)
+    if law is None:
+        raise ValueError(f"Unknown control law: {name!r}")
+    return register_control_law(law)
+
+
+def control_law_for(robot_id: int) -> ControlLaw:
+    """
+    The law configured for a robot in ROBOT_CONTROL_LAWS, or DEFAULT_CONTROL_LAW.
+    """
+    return get_control_law(ROBOT_CONTROL_LAWS.get(robot_id, DEFAULT_CONTROL_LAW))
+
+
+def assign_control_laws(num_robots: int) -> None:
+    """
+    Resolve every robot's law once, so the hot path only indexes:
+
+        robot_laws[robot_id]   scalar form, called per packet
+        robot_law_groups       (law, robot ids) pairs, one batch call per law per tick
+    """
+    global robot_laws, robot_law_groups
+
+    laws = [control_law_for(robot_id) for robot_id in range(num_robots)]
+    groups = {}
+    for robot_id, law in enumerate(laws):
+        groups.setdefault(law.name, (law, []))[1].append(robot_id)
+
+    robot_laws = [law.scalar for law in laws]
+    robot_law_groups = [
+        (law, np.array(robot_ids, dtype=np.intp)) for law, robot_ids in groups.values()
+    ]
+
+
+# Per-robot scalar laws and per-law robot groups (see assign_control_laws())
+robot_laws: list = []
+robot_law_groups: list = []
+assign_control_laws(NUM_ROBOTS)
 
 # -----------------------------------------------------------------------------
-# Main
+# Runtime parameter updates (CONFIG_PORT)
 # -----------------------------------------------------------------------------
 
-if __name__ == "__main__":
-    signal.signal(signal.SIGINT, signal_handler)
+def apply_control_params(motor_max: float, alpha: float, epoch: Optional[int] = None) -> None:
+    """
+    Switch MOTOR_MAX_OUTPUT / SIGMOID_ALPHA at runtime.
+
+    Every derived table (the shared lookup table and the "<law>@<alpha>"
+    variants, which follow M_max) is built first, in the calling thread. The
+    swap itself is a handful of assignments under params_lock; the per-packet
+    path takes no lock and only waits on it if it reads the table mid-swap.
+
+    `epoch` is given by ingest workers replaying a swap made in the main
+    process; a swap made here is published to the workers through shared_params.
+    """
+    global motor_table, MOTOR_MAX_OUTPUT, SIGMOID_ALPHA, param_epoch, param_swap_time
+
+    build_start = time.perf_counter()
+    table = MotorTable(motor_max, alpha) if MOTOR_LOOKUP_TABLE else None
+    variants = [
+        alpha_variant_law(name, motor_max) for name in list(control_laws)
+        if ALPHA_VARIANT_PATTERN.fullmatch(name)
+    ] if motor_max != MOTOR_MAX_OUTPUT else []
+    build_ms = 1000.0 * (time.perf_counter() - build_start)
+
+    swap_start = time.perf_counter()
+    with params_lock:
+        if table is not None:
+            motor_table = table
+        MOTOR_MAX_OUTPUT = motor_max
+        SIGMOID_ALPHA = alpha
+        for law in variants:
+            register_control_law(law)
+        if variants:
+            assign_control_laws(len(robot_laws))
+        param_epoch = param_epoch + 1 if epoch is None else epoch
+        param_swap_time = time.time()
+    swap_us = 1e6 * (time.perf_counter() - swap_start)
+
+    if epoch is None and shared_params is not None:
+        shared_params[1] = motor_max
+        shared_params[2] = alpha
+        shared_params[0] = param_epoch
 
-    logger.info("Starting johnbot2 controller")
     logger.info(
-        f"Phototaxis mapping: M_max={MOTOR_MAX_OUTPUT}, alpha={SIGMOID_ALPHA}, "
-        f"{NUM_ROBOTS} robots"
+        f"Control parameters updated (epoch {param_epoch}): M_max={motor_max}, "
+        f"alpha={alpha}; tables built in {build_ms:.0f} ms, swapped in {swap_us:.0f} us"
     )
 
-    # Set up CSV logging
-    setup_csv_logging()
 
-    # Set up OSC servers and clients
-    servers = setup_sensor_servers()
-    motor_clients = setup_motor_clients()
+def current_control_params() -> tuple[int, float, float, float]:
+    """
+    (param_epoch, param_swap_time, M_max, alpha), read together.
+    """
+    with params_lock:
+        return param_epoch, param_swap_time, MOTOR_MAX_OUTPUT, SIGMOID_ALPHA
 
-    # Start background threads
-    monitor_thread = threading.Thread(target=monitor_robot_states, daemon=True)
-    monitor_thread.start()
 
-    csv_thread = threading.Thread(target=csv_logging_thread, daemon=True)
-    csv_thread.start()
+def osc_config_handler(fields: tuple[str, ...], addr: str, *args) -> None:
+    """
+    OSC handler for /config, /config/motor_max and /config/alpha.
+    """
+    if len(args) != len(fields):
+        logger.warning(f"{addr}: expected {len(fields)} argument(s), got {args}")
+        return
+
+    try:
+        values = [float(value) for value in args]
+    except (TypeError, ValueError):
+        logger.warning(f"{addr}: non-numeric argument(s) {args}")
+        return
+    if not all(math.isfinite(value) and value > 0.0 for value in values):
+        logger.warning(f"{addr}: values must be finite and > 0, got {args}")
+        return
+
+    params = {"motor_max": MOTOR_MAX_OUTPUT, "alpha": SIGMOID_ALPHA}
+    for field, value in zip(fields, values):
+        params[field] = int(value) if value.is_integer() else value
+    apply_control_params(params["motor_max"], params["alpha"])
+
+
+def start_config_server() -> osc_server.BlockingOSCUDPServer:
+    """
+    Serve /config messages on CONFIG_PORT from a daemon thread.
+
+    One thread handles updates one at a time, so table builds never overlap
+    and never run on an ingest thread or the event loop.
+    """
+    disp = dispatcher.Dispatcher()
+    disp.map("/config", partial(osc_config_handler, ("motor_max", "alpha")))
+    disp.map("/config/motor_max", partial(osc_config_handler, ("motor_max",)))
+    disp.map("/config/alpha", partial(osc_config_handler, ("alpha",)))
+
+    server = osc_server.BlockingOSCUDPServer(("0.0.0.0", CONFIG_PORT), disp)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Listening for /config parameter updates on UDP port {CONFIG_PORT}")
+    return server
+
+# -----------------------------------------------------------------------------
+# CSV logging
+# -----------------------------------------------------------------------------
+
+# Row layout: seq, timestamp, sensor_left, sensor_right, motor_left, motor_right,
+#             coalesced (stale /sensor packets skipped by the ingest),
+#             filtered_left, filtered_right (the control law's input),
+#             requested_left, requested_right (the control law's output),
+#             packets (/sensor readings handled; in tick mode, more than the
+#             rows written)
+ROBOT_BUFFER_FIELDS = 12
+
+
+def threaded_ingest() -> bool:
+    """
+    True when each datagram is handled on its own thread (ThreadingOSCUDPServer),
+    so two handlers of the same robot can run at once. Selector ingest, ingest
+    workers and asyncio handle a robot's datagrams on one thread.
+    """
+    return CONTROLLER_MODE == "threads" and INGEST_MODE == "threaded"
+
+
+class RobotBuffer:
+    """
+    Latest logged data of every robot, in one flat float64 array.
+
+    Each robot owns a fixed row of ROBOT_BUFFER_FIELDS. The array is either
+    private (array('d')) or a view of a shared memory block, so the same
+    buffer can be filled by ingest worker processes and read by the process
+    that writes the CSV frames.
+
+    Rows are written under a per-row sequence counter (odd while a write is in
+    progress), so a reader never returns a half-updated row. Readers never lock.
+
+    Under threaded ingest, where OSC handler threads can run concurrently for
+    the same robot, row_locks[robot_id] serializes a robot's whole control
+    step (handle_sensor_values()), including its write() here, so write()
+    itself does not lock. In the other ingest modes each robot is handled by a
+    single thread and row_locks are no-op nullcontext()s, as state_lock is
+    under asyncio.
+    """
+
+    def __init__(self, num_robots: int, buf=None) -> None:
+        size = num_robots * ROBOT_BUFFER_FIELDS
+        if buf is None:
+            self.values = array("d", bytes(8 * size))
+        else:
+            self.values = memoryview(buf).cast("d")[:size]
+        self.num_robots = num_robots
+        if threaded_ingest():
+            self.row_locks = [threading.Lock() for _ in range(num_robots)]
+        else:
+            self.row_locks = [nullcontext()] * num_robots
+
+    def write(self,
+              robot_id: int,
+              timestamp: float,
+              left_sensor: float,
+              right_sensor: float,
+              left_motor: int,
+              right_motor: int,
+              filtered_left: float = 0.0,
+              filtered_right: float = 0.0,
+              requested_left: int = 0,
+              requested_right: int = 0) -> None:
+        v = self.values
+        base = robot_id * ROBOT_BUFFER_FIELDS
+        v[base] += 1.0
+        v[base + 1] = timestamp
+        v[base + 2] = left_sensor
+        v[base + 3] = right_sensor
+        v[base + 4] = left_motor
+        v[base + 5] = right_motor
+        v[base + 7] = filtered_left
+        v[base + 8] = filtered_right
+        v[base + 9] = requested_left
+        v[base + 10] = requested_right
+        v[base] += 1.0
+
+    def snapshot(self, out: np.ndarray) -> None:
+        """
+        Copy every row into `out` (num_robots x ROBOT_BUFFER_FIELDS) with one
+        array copy; rows caught mid-write are read again one by one.
+        """
+        view = np.frombuffer(self.values, dtype=np.float64).reshape(self.num_robots, ROBOT_BUFFER_FIELDS)
+        np.copyto(out, view)
+        torn = (out[:, 0] % 2.0 != 0.0) | (view[:, 0] != out[:, 0])
+        for robot_id in np.flatnonzero(torn).tolist():
+            while True:
+                out[robot_id] = view[robot_id]
+                seq = out[robot_id, 0]
+                if seq == view[robot_id, 0] and not seq % 2.0:
+                    break
+
+    def updates(self, robot_id: int) -> tuple[float, int]:
+        """
+        Return (timestamp of the last write, number of /sensor readings handled)
+        for a robot.
+        """
+        base = robot_id * ROBOT_BUFFER_FIELDS
+        return self.values[base + 1], int(self.values[base + 11])
+
+    def count_packet(self, robot_id: int) -> None:
+        # Called at ingest, serialized per robot like write()
+        self.values[robot_id * ROBOT_BUFFER_FIELDS + 11] += 1.0
+
+    def count_coalesced(self, robot_id: int, count: int) -> None:
+        # Selector ingest only: one thread per robot
+        self.values[robot_id * ROBOT_BUFFER_FIELDS + 6] += count
+
+    def coalesced(self, robot_id: int) -> int:
+        return int(self.values[robot_id * ROBOT_BUFFER_FIELDS + 6])
+
+    def release(self) -> None:
+        if isinstance(self.values, memoryview):
+            self.values.release()
+
+# Latest per-robot data used when writing frames
+robot_buffer = RobotBuffer(NUM_ROBOTS)
+
+
+def law_input_logged() -> bool:
+    return bool(SENSOR_FILTER) or SENSOR_PREDICTION
+
+
+class FrameLayout:
+    """
+    Columns of a log frame. `columns` lists (name, little-endian numpy dtype)
+    of every column, in order:
+        - timestamp (wall clock when the frame was sampled), frame_index (the
+          frame's slot on the 24 fps schedule; a gap means missed frames),
+        - for each robot: sensor_left, sensor_right, motor_left, motor_right,
+        - with SENSOR_FILTER or SENSOR_PREDICTION set, also filtered_left,
+          filtered_right per robot (the sensor values the control law saw),
+        - with motor shaping, also requested_left, requested_right per robot
+          (motor_left/right are then the values sent),
+        - with CONFIG_PORT set: param_epoch, param_swap_time, motor_max,
+          sigmoid_alpha (the parameters in effect when the frame was written).
+
+    The CSV header and the binary header are both built from `columns`. The
+    dtypes are those of the binary log. Readings fit float32 exactly (the
+    firmware sends 0-255) and motor commands int16; the law's input stays
+    float64 so log_tools can recompute the law bit for bit. Each robot field
+    also names the RobotBuffer field it is taken from.
+    """
+
+    def __init__(self, num_robots: int) -> None:
+        self.num_robots = num_robots
+        self.robot_fields = [
+            ("sensor_left", 2, "<f4"),
+            ("sensor_right", 3, "<f4"),
+            ("motor_left", 4, "<i2"),
+            ("motor_right", 5, "<i2"),
+        ]
+        if law_input_logged():
+            self.robot_fields += [("filtered_left", 7, "<f8"), ("filtered_right", 8, "<f8")]
+        if motor_shaping_enabled():
+            self.robot_fields += [("requested_left", 9, "<i2"), ("requested_right", 10, "<i2")]
+        self.param_fields = [
+            ("param_epoch", "<i4"),
+            ("param_swap_time", "<f8"),
+            ("motor_max", "<f8"),
+            ("sigmoid_alpha", "<f8"),
+        ] if CONFIG_PORT is not None else []
+
+        # Frame columns [robots_start, robots_end) hold the robot blocks
+        self.robots_start = 2
+        self.robots_end = self.robots_start + num_robots * len(self.robot_fields)
+        self.columns = [("timestamp", "<f8"), ("frame_index", "<i4")]
+        for i in range(num_robots):
+            self.columns.extend((f"robot{i}_{name}", dtype) for name, _, dtype in self.robot_fields)
+        self.columns.extend(self.param_fields)
+
+    def record_dtype(self) -> np.dtype:
+        """
+        Packed numpy dtype of one binary record, with the robot blocks as a
+        nested (num_robots,) field, so each robot field of a batch of frames
+        is a single strided view. Byte layout equals `columns`.
+        """
+        robot = np.dtype([(name, dtype) for name, _, dtype in self.robot_fields])
+        return np.dtype(
+            [("timestamp", "<f8"), ("frame_index", "<i4"), ("robots", robot, (self.num_robots,))]
+            + self.param_fields
+        )
+
+
+class FrameBuilder:
+    """
+    Builds log frames from robot_buffer into preallocated arrays.
+
+    snapshot() copies the whole buffer at once and lays it out as one frame
+    (robots without a recent update as zeros) stamped with the wall-clock
+    time; fill() copies it into a queue slot with its frame index.
+    """
+
+    def __init__(self, layout: FrameLayout) -> None:
+        self.layout = layout
+        self.rows = np.zeros((layout.num_robots, ROBOT_BUFFER_FIELDS))
+        self.frame = np.zeros(len(layout.columns))
+        self.robots = self.frame[layout.robots_start:layout.robots_end].reshape(layout.num_robots, len(layout.robot_fields))
+        self.buffer_fields = [field for _, field, _ in layout.robot_fields]
+
+    def snapshot(self, now: float) -> None:
+        self.frame[0] = now
+        robot_buffer.snapshot(self.rows)
+        self.robots[:] = self.rows[:, self.buffer_fields]
+        # Never written, or no recent data: zeros
+        self.robots[(self.rows[:, 0] == 0.0) | (now - self.rows[:, 1] > 0.5)] = 0.0
+        if self.layout.param_fields:
+            self.frame[self.layout.robots_end:] = current_control_params()
+
+    def fill(self, frame: np.ndarray, frame_index: int) -> None:
+        frame[:] = self.frame
+        frame[1] = frame_index
+
+
+class FrameQueue:
+    """
+    Bounded FIFO of preallocated frames between the frame producer and the log
+    writer thread.
+
+    Frames live in one (capacity, columns) float64 array used as a ring. The
+    producer fills the slot returned by reserve() and publishes it with
+    commit(); the writer takes everything committed with drain(), which copies
+    the frames out under the lock. A full queue never blocks the producer:
+    `policy` drops either the new frame or the oldest queued one.
+    """
+
+    def __init__(self, capacity: int, num_columns: int, policy: str) -> None:
+        if policy not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"Unknown LOG_QUEUE_POLICY {policy!r}, expected drop_newest or drop_oldest")
+        self.frames = np.zeros((capacity, num_columns))
+        self.capacity = capacity
+        self.policy = policy
+        self.ready = threading.Condition()
+        self.head = 0          # frames committed
+        self.tail = 0          # frames drained or dropped
+        self.dropped = 0
+        self.max_depth = 0     # since the last take_max_depth()
+        self.closed = False
+
+    def depth(self) -> int:
+        return self.head - self.tail
+
+    def reserve(self) -> Optional[np.ndarray]:
+        """
+        Slot for the next frame, or None if the queue is full and the policy
+        drops the new frame.
+        """
+        with self.ready:
+            if self.head - self.tail == self.capacity:
+                self.dropped += 1
+                if self.policy == "drop_newest":
+                    return None
+                self.tail += 1
+            return self.frames[self.head % self.capacity]
+
+    def commit(self) -> None:
+        with self.ready:
+            self.head += 1
+            depth = self.head - self.tail
+            self.max_depth = max(self.max_depth, depth)
+            if depth >= LOG_BATCH_FRAMES:
+                self.ready.notify()
+
+    def drain(self, timeout: float) -> np.ndarray:
+        """
+        Wait up to `timeout` seconds for a full batch, then take every queued
+        frame (a copy, possibly empty).
+        """
+        with self.ready:
+            if self.head - self.tail < LOG_BATCH_FRAMES and not self.closed:
+                self.ready.wait(timeout)
+            frames = self.frames[np.arange(self.tail, self.head) % self.capacity]
+            self.tail = self.head
+            return frames
+
+    def take_max_depth(self) -> int:
+        with self.ready:
+            depth, self.max_depth = self.max_depth, self.head - self.tail
+            return depth
+
+    def close(self) -> None:
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+
+# First key of the binary log header
+BINARY_LOG_FORMAT = "johnbot2-frames"
+
+
+class CsvLogWriter:
+    """
+    Writes batches of frames as CSV rows (integer columns without a decimal
+    point), formatted in memory and passed to the file in one write().
+    """
+
+    def __init__(self, file, layout: FrameLayout) -> None:
+        self.file = file
+        self.int_columns = [
+            index for index, (_, dtype) in enumerate(layout.columns) if dtype.startswith("<i")
+        ]
+        csv.writer(file).writerow([name for name, _ in layout.columns])
+
+    def writerows(self, frames: np.ndarray) -> int:
+        rows = frames.astype(object)
+        rows[:, self.int_columns] = frames[:, self.int_columns].astype(np.int64).astype(object)
+        text = io.StringIO()
+        csv.writer(text).writerows(rows.tolist())
+        return self.file.write(text.getvalue())
+
+
+class BinaryLogWriter:
+    """
+    Writes batches of frames as fixed-size little-endian records, packed with
+    a few strided array copies (see FrameLayout.record_dtype()) and passed to
+    the file in one write().
+
+    The file starts with a single JSON line (space-padded to a multiple of 8
+    bytes) holding the column names and dtypes, the record size and the frame
+    interval, so a reader needs no knowledge of the robot count or options.
+    """
+
+    def __init__(self, file, layout: FrameLayout) -> None:
+        self.file = file
+        self.layout = layout
+        self.dtype = layout.record_dtype()
+        header = json.dumps(
+            {
+                "format": BINARY_LOG_FORMAT,
+                "version": 1,
+                "columns": [[name, dtype] for name, dtype in layout.columns],
+                "record_size": self.dtype.itemsize,
+                "frame_interval": FRAME_INTERVAL,
+            }
+        )
+        padding = -(len(header) + 1) % 8
+        file.write(header.encode("ascii") + b" " * padding + b"\n")
+
+    def writerows(self, frames: np.ndarray) -> int:
+        layout = self.layout
+        records = np.empty(len(frames), dtype=self.dtype)
+        records["timestamp"] = frames[:, 0]
+        records["frame_index"] = frames[:, 1]
+        robots = records["robots"]
+        step = len(layout.robot_fields)
+        for offset, (name, _, _) in enumerate(layout.robot_fields):
+            robots[name] = frames[:, layout.robots_start + offset:layout.robots_end:step]
+        for offset, (name, _) in enumerate(layout.param_fields):
+            records[name] = frames[:, layout.robots_end + offset]
+        return self.file.write(records.tobytes())
+
+
+# First key of a segment manifest
+LOG_MANIFEST_FORMAT = "johnbot2-manifest"
+
+# File suffix per LOG_COMPRESSION
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "lzma": ".xz"}
+
+
+def open_log_stream(raw):
+    """
+    Wrap a binary file opened for writing in the LOG_COMPRESSION compressor, if any.
+    """
+    if LOG_COMPRESSION == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=LOG_COMPRESSION_LEVEL)
+    if LOG_COMPRESSION == "lzma":
+        return lzma.LZMAFile(raw, "wb", preset=LOG_COMPRESSION_LEVEL)
+    return raw
+
+
+class LogOutput:
+    """
+    One log format ("csv" or "binary") written as a sequence of segment files,
+    each optionally compressed and each complete in itself (it starts with its
+    own header).
+
+    write() starts a new segment first when the current one has reached
+    LOG_ROTATE_BYTES of uncompressed data or is LOG_ROTATE_SECONDS old, so
+    segments split at batch boundaries. With rotation on, the manifest is
+    rewritten (atomically) whenever a segment is opened and at close.
+
+    A gzip stream is flushed after every batch, so all but the last batch
+    survive a crash. lzma cannot flush mid-stream: an open segment's data sits
+    in the compressor (and its compressed size lags) until the segment is
+    closed, so keep segments short with lzma.
+    """
+
+    def __init__(self, stem: str, log_format: str, layout: FrameLayout) -> None:
+        if LOG_COMPRESSION not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown LOG_COMPRESSION {LOG_COMPRESSION!r}, expected None, gzip or lzma")
+        self.stem = stem
+        self.log_format = log_format
+        self.layout = layout
+        self.extension = ".csv" if log_format == "csv" else ".bin"
+        self.rotating = LOG_ROTATE_BYTES is not None or LOG_ROTATE_SECONDS is not None
+        self.manifest_path = stem + self.extension + ".manifest.json"
+        self.segments = []          # manifest entries, in order
+        self.bytes = 0              # uncompressed bytes written, all segments
+        self.open_segment()
+
+    def open_segment(self) -> None:
+        name = os.path.basename(self.stem)
+        if self.rotating:
+            name += f"_{len(self.segments):03d}"
+        name += self.extension + COMPRESSION_SUFFIXES[LOG_COMPRESSION]
+        self.path = os.path.join(os.path.dirname(self.stem), name)
+
+        self.raw = open(self.path, "wb")
+        stream = open_log_stream(self.raw)
+        if self.log_format == "csv":
+            self.file = io.TextIOWrapper(stream, encoding="ascii", newline="")
+            self.writer = CsvLogWriter(self.file, self.layout)
+        else:
+            self.file = stream
+            self.writer = BinaryLogWriter(stream, self.layout)
+        self.file.flush()
+
+        self.opened = time.monotonic()
+        self.segment = {
+            "file": name,
+            "frames": 0,
+            "first_frame": None,
+            "last_frame": None,
+            "start_time": None,
+            "end_time": None,
+            "bytes": 0,
+            "compressed_bytes": None,
+        }
+        self.segments.append(self.segment)
+        if self.rotating:
+            self.write_manifest(complete=False)
+            logger.info(f"Log segment started: {self.path}")
+
+    def rotation_due(self) -> bool:
+        if not self.rotating or not self.segment["frames"]:
+            return False
+        if LOG_ROTATE_BYTES is not None and self.segment["bytes"] >= LOG_ROTATE_BYTES:
+            return True
+        return LOG_ROTATE_SECONDS is not None and time.monotonic() - self.opened >= LOG_ROTATE_SECONDS
+
+    def write(self, frames: np.ndarray) -> int:
+        """
+        Write a batch of frames and flush it; returns the uncompressed bytes written.
+        """
+        if self.rotation_due():
+            self.close_segment()
+            self.open_segment()
+        written = self.writer.writerows(frames)
+        self.file.flush()
+
+        segment = self.segment
+        if segment["first_frame"] is None:
+            segment["first_frame"] = int(frames[0, 1])
+            segment["start_time"] = float(frames[0, 0])
+        segment["last_frame"] = int(frames[-1, 1])
+        segment["frames"] += len(frames)
+        segment["end_time"] = float(frames[-1, 0])
+        segment["bytes"] += written
+        self.bytes += written
+        return written
+
+    def compressed_bytes(self) -> int:
+        """
+        Bytes on disk so far, all segments.
+        """
+        closed = sum(segment["compressed_bytes"] or 0 for segment in self.segments)
+        return closed if self.raw.closed else closed + self.raw.tell()
+
+    def close_segment(self) -> None:
+        self.file.close()
+        if not self.raw.closed:
+            self.raw.close()
+        self.segment["compressed_bytes"] = os.path.getsize(self.path)
+
+    def write_manifest(self, complete: bool) -> None:
+        manifest = {
+            "format": LOG_MANIFEST_FORMAT,
+            "version": 1,
+            "log_format": self.log_format,
+            "compression": LOG_COMPRESSION,
+            "rotate_bytes": LOG_ROTATE_BYTES,
+            "rotate_seconds": LOG_ROTATE_SECONDS,
+            "complete": complete,
+            "segments": self.segments,
+        }
+        temporary = self.manifest_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temporary, self.manifest_path)
+
+    def close(self) -> None:
+        self.close_segment()
+        if self.rotating:
+            self.write_manifest(complete=True)
+
+
+class LogWriter:
+    """
+    The single thread that writes log frames. It drains the frame queue and
+    hands each batch to every output, with one write() and flush() per file
+    per batch, so the frame producer (and with it the control path) never
+    waits on the disk or the compressor. A failed write is logged and its
+    frames counted as lost.
+    """
+
+    def __init__(self, queue: FrameQueue, outputs: list[LogOutput]) -> None:
+        self.queue = queue
+        self.outputs = outputs
+        self.frames = 0
+        self.batches = 0
+        self.lost = 0
+        self.write_time = 0.0
+        self.write_max = 0.0
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        next_report = time.monotonic() + STATS_INTERVAL
+        while True:
+            frames = self.queue.drain(LOG_FLUSH_INTERVAL)
+            if len(frames):
+                self.write(frames)
+            elif self.queue.closed:
+                break
+            # close() reports the totals once the queue is drained
+            if not self.queue.closed and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + STATS_INTERVAL
+
+    def write(self, frames: np.ndarray) -> None:
+        start = time.perf_counter()
+        try:
+            for output in self.outputs:
+                output.write(frames)
+        except (OSError, ValueError) as e:
+            logger.error(f"Log writer: {len(frames)} frames lost: {e}")
+            self.lost += len(frames)
+            return
+        elapsed = time.perf_counter() - start
+        self.frames += len(frames)
+        self.batches += 1
+        self.write_time += elapsed
+        self.write_max = max(self.write_max, elapsed)
+
+    def report(self) -> None:
+        queue = self.queue
+        batch = self.frames / self.batches if self.batches else 0.0
+        write_ms = 1000.0 * self.write_time / self.batches if self.batches else 0.0
+        written = sum(output.bytes for output in self.outputs)
+        rate = written / self.write_time / 1e6 if self.write_time else 0.0
+        if LOG_COMPRESSION is not None and written:
+            stored = sum(output.compressed_bytes() for output in self.outputs)
+            volume = f"{written / 1e6:.2f} MB {LOG_COMPRESSION} to {100.0 * stored / written:.0f}% at {rate:.1f} MB/s"
+        else:
+            volume = f"{written / 1e6:.2f} MB at {rate:.1f} MB/s"
+        logger.info(
+            f"Log writer: {self.frames} frames in {self.batches} batches ({batch:.1f} per batch), "
+            f"queue depth {queue.depth()}/{queue.capacity} (max {queue.take_max_depth()}), "
+            f"{queue.dropped} dropped ({queue.policy}), {self.lost} lost, "
+            f"write mean {write_ms:.2f} ms / max {1000.0 * self.write_max:.2f} ms, {volume}"
+        )
+
+    def close(self) -> None:
+        """
+        Write whatever is still queued, stop the thread and close the files.
+        """
+        self.queue.close()
+        self.thread.join()
+        for output in self.outputs:
+            output.close()
+        self.report()
+
+
+def new_log_stem() -> str:
+    """
+    Path prefix shared by the log files of a run: LOG_DIR/johnbot2_<start time>.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(LOG_DIR, f"johnbot2_{timestamp}")
+
+
+def setup_csv_logging(log_format: Optional[str] = None, stem: Optional[str] = None) -> None:
+    """
+    Create the log file(s) for `log_format` (default LOG_FORMAT) under `stem`
+    (default new_log_stem()), the frame queue and the log writer thread.
+
+    The log has one row or record per time frame (24 fps), with the columns
+    of FrameLayout.columns; the binary log is written next to the CSV with a .bin
+    extension. See LOG_COMPRESSION / LOG_ROTATE_* for compressed and
+    segmented logs.
+    """
+    global frame_queue, frame_builder, log_writer
+
+    log_format = log_format or LOG_FORMAT
+    if log_format not in ("csv", "binary", "both"):
+        raise ValueError(f"Unknown LOG_FORMAT {log_format!r}, expected csv, binary or both")
+
+    stem = stem or new_log_stem()
+    layout = FrameLayout(NUM_ROBOTS)
+    outputs = []
+
+    if log_format in ("csv", "both"):
+        output = LogOutput(stem, "csv", layout)
+        outputs.append(output)
+        logger.info(f"CSV log file created: {output.path}")
+
+    if log_format in ("binary", "both"):
+        output = LogOutput(stem, "binary", layout)
+        outputs.append(output)
+        logger.info(f"Binary log file created: {output.path} ({output.writer.dtype.itemsize} bytes per frame)")
+
+    frame_builder = FrameBuilder(layout)
+    frame_queue = FrameQueue(LOG_QUEUE_FRAMES, len(layout.columns), LOG_QUEUE_POLICY)
+    log_writer = LogWriter(frame_queue, outputs)
+
+
+def close_log_files() -> None:
+    """
+    Drain the frame queue, stop the log writer and close the log files.
+    """
+    global frame_queue, frame_builder, log_writer
+
+    if log_writer is None:
+        return
+    writer = log_writer
+    frame_queue = frame_builder = log_writer = None
+    writer.close()
+    logger.info("Log files closed")
+
+
+def log_data_to_buffer(robot_id: int,
+                       left_sensor: float,
+                       right_sensor: float,
+                       left_motor: int,
+                       right_motor: int,
+                       filtered_left: float = 0.0,
+                       filtered_right: float = 0.0,
+                       requested_left: int = 0,
+                       requested_right: int = 0) -> None:
+    """
+    Store the latest data for a robot in a buffer.
+    The logging thread turns this buffer into a log frame at 24 fps.
+    """
+    robot_buffer.write(
+        robot_id,
+        time.time(),
+        left_sensor,
+        right_sensor,
+        left_motor,
+        right_motor,
+        filtered_left,
+        filtered_right,
+        requested_left,
+        requested_right,
+    )
+
+
+class FrameClock:
+    """
+    Absolute frame deadlines on time.monotonic_ns(), with jitter statistics.
+
+    Frame k is due at start + k * FRAME_INTERVAL, computed exactly in integer
+    nanoseconds, so the schedule never drifts however long the run. When the
+    loop wakes up late, it writes the latest frame that is due and skips the
+    frames in between. Skipped frames are counted, never written late or
+    twice; in the log they show up as a gap in frame_index.
+    """
+
+    def __init__(self) -> None:
+        period = Fraction(FRAME_INTERVAL).limit_denominator(1_000_000)
+        self.period_ns = (period.numerator * 1_000_000_000, period.denominator)
+        self.start_ns = time.monotonic_ns()
+        self.next_index = 0
+        self.written = 0
+        self.missed = 0
+        self.next_report = self.start_ns + int(STATS_INTERVAL * 1e9)
+        self.reset()
+
+    def reset(self) -> None:
+        self.frames = 0
+        self.frames_missed = 0
+        self.lateness_sum = 0
+        self.lateness_squares = 0
+        self.lateness_max = 0
+
+    def deadline_ns(self, index: int) -> int:
+        numerator, denominator = self.period_ns
+        return self.start_ns + index * numerator // denominator
+
+    def next_frame(self, now_ns: int) -> Optional[int]:
+        """
+        Index of the frame to write at `now_ns`, or None if none is due yet.
+        """
+        if now_ns < self.deadline_ns(self.next_index):
+            return None
+        numerator, denominator = self.period_ns
+        # Latest frame whose (rounded down) deadline has passed
+        index = ((now_ns - self.start_ns + 1) * denominator - 1) // numerator
+        missed = index - self.next_index
+        lateness = now_ns - self.deadline_ns(index)
+        self.next_index = index + 1
+
+        self.written += 1
+        self.missed += missed
+        self.frames += 1
+        self.frames_missed += missed
+        self.lateness_sum += lateness
+        self.lateness_squares += lateness * lateness
+        self.lateness_max = max(self.lateness_max, lateness)
+        return index
+
+    def maybe_report(self, now_ns: int) -> None:
+        if now_ns < self.next_report or not self.frames:
+            return
+        mean = self.lateness_sum / self.frames
+        std = math.sqrt(max(self.lateness_squares / self.frames - mean * mean, 0.0))
+        logger.info(
+            f"Log frames: {self.frames} at {1.0 / FRAME_INTERVAL:.0f} fps, "
+            f"jitter mean {mean / 1e6:.2f} ms / std {std / 1e6:.2f} ms / "
+            f"max {self.lateness_max / 1e6:.2f} ms, {self.frames_missed} missed"
+        )
+        self.reset()
+        self.next_report = now_ns + int(STATS_INTERVAL * 1e9)
+
+
+def write_frame_to_csv(frame_index: int) -> None:
+    """
+    Build frame `frame_index` from the latest data of every robot and queue it
+    for the log writer. If a robot has not sent a recent update, zeros are
+    written for that robot. Never waits on the disk; a full queue drops
+    frames (LOG_QUEUE_POLICY).
+    """
+    queue, builder = frame_queue, frame_builder
+    if queue is None or builder is None:
+        return
+
+    builder.snapshot(time.time())
+    frame = queue.reserve()
+    if frame is not None:
+        builder.fill(frame, frame_index)
+        queue.commit()
+
+
+def csv_logging_thread() -> None:
+    """
+    Background thread that writes a frame at every FRAME_INTERVAL deadline.
+    """
+    global frame_clock
+    frame_clock = clock = FrameClock()
+
+    while running:
+        now_ns = time.monotonic_ns()
+        frame_index = clock.next_frame(now_ns)
+        if frame_index is None:
+            time.sleep((clock.deadline_ns(clock.next_index) - now_ns) / 1e9)
+            continue
+        write_frame_to_csv(frame_index)
+        clock.maybe_report(now_ns)
+
+# -----------------------------------------------------------------------------
+# Raw event log (EVENT_LOG)
+# -----------------------------------------------------------------------------
+
+# First key of the event log header
+EVENT_LOG_FORMAT = "johnbot2-events"
+
+# Event kinds
+EVENT_SENSOR = 1              # /sensor reading handled
+EVENT_SENSOR_COALESCED = 2    # /sensor reading received, skipped as stale (COALESCE_SENSOR_PACKETS)
+EVENT_MOTOR = 3               # /motor sent
+EVENT_KINDS = {EVENT_SENSOR: "sensor", EVENT_SENSOR_COALESCED: "sensor_coalesced", EVENT_MOTOR: "motor"}
+
+# One record: time.monotonic_ns(), robot, kind, source (0 = main process,
+# 1 + worker index for an ingest worker), left and right value
+EVENT_COLUMNS = [
+    ("t_ns", "<i8"),
+    ("robot", "<u2"),
+    ("kind", "u1"),
+    ("source", "u1"),
+    ("left", "<f4"),
+    ("right", "<f4"),
+]
+_event_record = struct.Struct("<qHBBff")
+
+
+class EventLog:
+    """
+    Append-only log of raw /sensor and /motor events with its own writer thread.
+
+    record() packs one event with struct.pack_into() at the end of the current
+    buffer (a preallocated bytearray of EVENT_LOG_BATCH records). A full buffer
+    is queued for the writer thread and replaced by a free one, so the file
+    sees one write() per EVENT_LOG_BATCH events. When no buffer is free, the
+    event is dropped and counted: record() never waits on the disk.
+
+    Events are recorded from several threads under threaded ingest (one per
+    datagram) and in threads-mode tick control (ingest and tick thread), and
+    record() then holds a lock for the pack. Otherwise (asyncio, reactive
+    selector ingest) a single thread records, and the lock is a no-op
+    nullcontext() like the RobotBuffer row locks. Every LOG_FLUSH_INTERVAL the
+    partly filled buffer is queued too: by the writer thread under the lock,
+    or with a single recording thread by record() itself at its next event,
+    so only that thread ever touches the current buffer.
+
+    The file starts with a JSON header line like the binary frame log's, which
+    also holds a (time.monotonic_ns(), time.time_ns()) pair taken at open, to
+    turn event times into frame log timestamps.
+    """
+
+    def __init__(self, path: str, source: int = 0) -> None:
+        if EVENT_LOG_BUFFERS < 2:
+            raise ValueError("EVENT_LOG_BUFFERS must be at least 2")
+        self.path = path
+        self.source = source
+        self.capacity = EVENT_LOG_BATCH * _event_record.size
+        self.buffer = bytearray(self.capacity)
+        self.offset = 0
+        self.free = deque(bytearray(self.capacity) for _ in range(EVENT_LOG_BUFFERS - 1))
+        self.full = deque()
+        self.shared = threaded_ingest() or (CONTROLLER_MODE == "threads" and CONTROL_MODE == "tick")
+        self.lock = threading.Lock() if self.shared else nullcontext()
+        self.flush_due = False
+        self.ready = threading.Event()
+        self.closing = False
+        self.events = 0
+        self.dropped = 0
+        self.lost = 0
+        self.bytes = 0
+
+        self.raw = open(path, "wb")
+        self.file = open_log_stream(self.raw)
+        header = json.dumps(
+            {
+                "format": EVENT_LOG_FORMAT,
+                "version": 1,
+                "columns": [[name, dtype] for name, dtype in EVENT_COLUMNS],
+                "record_size": _event_record.size,
+                "kinds": {str(kind): name for kind, name in EVENT_KINDS.items()},
+                "source": source,
+                "clock_origin": {"monotonic_ns": time.monotonic_ns(), "time_ns": time.time_ns()},
+            }
+        )
+        padding = -(len(header) + 1) % 8
+        self.file.write(header.encode("ascii") + b" " * padding + b"\n")
+        self.file.flush()
+
+        self.thread = threading.Thread(target=self.run, name="event-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, robot_id: int, kind: int, left: float, right: float) -> None:
+        with self.lock:
+            if self.offset == self.capacity and not self.swap():
+                self.dropped += 1
+                return
+            offset = self.offset
+            _event_record.pack_into(
+                self.buffer, offset, time.monotonic_ns(), robot_id, kind, self.source, left, right
+            )
+            self.offset = offset = offset + _event_record.size
+            if (offset == self.capacity or self.flush_due) and self.swap():
+                self.flush_due = False
+
+    def swap(self) -> bool:
+        """
+        Queue the current buffer for writing and continue in a free one; False
+        if none is free. The caller holds self.lock.
+        """
+        if not self.free:
+            return False
+        self.full.append((self.buffer, self.offset))
+        self.buffer = self.free.popleft()
+        self.offset = 0
+        self.ready.set()
+        return True
+
+    def run(self) -> None:
+        next_flush = time.monotonic() + LOG_FLUSH_INTERVAL
+        next_report = time.monotonic() + STATS_INTERVAL
+        while not self.closing:
+            self.ready.wait(LOG_FLUSH_INTERVAL)
+            self.ready.clear()
+            now = time.monotonic()
+            if now >= next_flush:
+                if self.shared:
+                    with self.lock:
+                        if self.offset:
+                            self.swap()
+                else:
+                    self.flush_due = True
+                next_flush = now + LOG_FLUSH_INTERVAL
+            self.write_pending()
+            if now >= next_report and not self.closing:
+                self.report()
+                next_report = now + STATS_INTERVAL
+
+        # Writing the queued buffers frees one for the unfinished tail. Without
+        # the lock, close() comes only after the recording thread has stopped
+        self.write_pending()
+        with self.lock:
+            if self.offset:
+                self.swap()
+        self.write_pending()
+
+    def write_pending(self) -> None:
+        size = _event_record.size
+        written = False
+        while self.full:
+            buffer, length = self.full.popleft()
+            try:
+                with memoryview(buffer) as view:
+                    self.file.write(view[:length])
+                self.events += length // size
+                self.bytes += length
+                written = True
+            except (OSError, ValueError) as e:
+                logger.error(f"Event log: {length // size} events lost: {e}")
+                self.lost += length // size
+            self.free.append(buffer)
+        if written:
+            self.file.flush()
+
+    def report(self) -> None:
+        logger.info(
+            f"Event log: {self.events} events written ({self.bytes / 1e6:.2f} MB), "
+            f"{self.dropped} dropped, {self.lost} lost"
+        )
+
+    def close(self) -> None:
+        """
+        Write every buffered event, stop the thread and close the file.
+        """
+        self.closing = True
+        self.ready.set()
+        self.thread.join()
+        self.file.close()
+        if not self.raw.closed:
+            self.raw.close()
+        self.report()
+
+
+def setup_event_log(stem: str, worker_index: Optional[int] = None) -> None:
+    """
+    Open the event log of this process: <stem>.events, or <stem>_w<k>.events
+    in ingest worker k.
+    """
+    global event_log
+
+    if worker_index is None:
+        path, source = stem + ".events", 0
+    else:
+        path, source = f"{stem}_w{worker_index}.events", worker_index + 1
+    path += COMPRESSION_SUFFIXES[LOG_COMPRESSION]
+    event_log = EventLog(path, source)
+    logger.info(f"Event log file created: {path}")
+
+
+def close_event_log() -> None:
+    """
+    Write the remaining events and close the event log, if one is open.
+    """
+    global event_log
+
+    if event_log is None:
+        return
+    log = event_log
+    event_log = None
+    log.close()
+
+# -----------------------------------------------------------------------------
+# OSC handling
+# -----------------------------------------------------------------------------
+
+def osc_sensor_handler(robot_id: int, addr: str, *args) -> None:
+    """
+    OSC handler for /sensor messages.
+
+    Expected message:
+        /sensor <float:left_sensor> <float:right_sensor>
+    """
+    if len(args) != 2:
+        logger.warning(
+            f"Robot {robot_id}: invalid /sensor message, expected 2 values, got {len(args)}"
+        )
+        return
+
+    try:
+        left_sensor = float(args[0])
+        right_sensor = float(args[1])
+    except ValueError:
+        logger.warning(
+            f"Robot {robot_id}: could not parse sensor values: {args}"
+        )
+        return
+
+    handle_sensor_values(robot_id, left_sensor, right_sensor)
+
+
+def handle_sensor_values(robot_id: int, left_sensor: float, right_sensor: float) -> None:
+    """
+    Control stage for one validated sensor reading: calibrate it, compute motor
+    commands, update the robot state and log buffer (raw readings), and send the
+    commands to the robot.
+
+    The filter, predictor, shaper and motor link keep per-robot state; under
+    threaded ingest the step runs under the robot's RobotBuffer row lock, so
+    they see one reading of a robot at a time.
+
+    With CONTROL_MODE == "tick", the reading is only stored for the next control tick.
+    """
+    events = event_log
+    if events is not None:
+        events.record(robot_id, EVENT_SENSOR, left_sensor, right_sensor)
+
+    if CONTROL_MODE == "tick":
+        store_sensor_values(robot_id, left_sensor, right_sensor)
+        return
+
+    now = time.monotonic()
+
+    # Filters, predictor, shaper and motor link keep per-robot state: under
+    # threaded ingest, concurrent handlers of one robot take turns here
+    with robot_buffer.row_locks[robot_id]:
+        # Calibrate, filter and predict, then compute motor commands with the robot's control law
+        law_left, law_right = left_sensor, right_sensor
+        if sensor_calibration is not None:
+            law_left, law_right = sensor_calibration.apply(robot_id, law_left, law_right)
+        if sensor_filter is not None:
+            law_left, law_right = sensor_filter.update(robot_id, law_left, law_right, now)
+        if sensor_predictor is not None:
+            sensor_predictor.update(robot_id, law_left, law_right, now)
+            law_left, law_right = sensor_predictor.predict(robot_id, now)
+        requested_left, requested_right = robot_laws[robot_id](law_left, law_right)
+
+        # Smooth and slew-limit the requested commands
+        if motor_shaper is not None:
+            left_motor, right_motor = motor_shaper.update(robot_id, requested_left, requested_right, now)
+        else:
+            left_motor, right_motor = requested_left, requested_right
+
+        with state_lock:
+            robot_states[robot_id]["sensors"] = (left_sensor, right_sensor)
+            robot_states[robot_id]["motors"] = (left_motor, right_motor)
+            robot_states[robot_id]["last_update"] = time.time()
+            robot_states[robot_id]["packets"] += 1
+
+        # Log to buffer for CSV
+        robot_buffer.count_packet(robot_id)
+        log_data_to_buffer(
+            robot_id,
+            left_sensor,
+            right_sensor,
+            left_motor,
+            right_motor,
+            law_left,
+            law_right,
+            requested_left,
+            requested_right,
+        )
+
+        # Send commands to the robot
+        if 0 <= robot_id < len(motor_clients):
+            link = motor_clients[robot_id]
+            try:
+                link.update_motor(left_motor, right_motor, now)
+                if LED_ENABLED:
+                    link.update_led(LED_COLOR, now)
+            except Exception as e:
+                logger.error(f"Robot {robot_id}: failed to send OSC command: {e}")
+        else:
+            logger.error(
+                f"Robot {robot_id}: no motor client configured (len={len(motor_clients)})"
+            )
+
+
+def store_sensor_values(robot_id: int, left_sensor: float, right_sensor: float) -> None:
+    """
+    Tick mode: keep the latest reading of a robot for run_control_tick().
+    """
+    with tick_lock:
+        tick_left[robot_id] = left_sensor
+        tick_right[robot_id] = right_sensor
+        tick_received[robot_id] = time.monotonic()
+        robot_buffer.count_packet(robot_id)
+
+    with state_lock:
+        robot_states[robot_id]["sensors"] = (left_sensor, right_sensor)
+        robot_states[robot_id]["last_update"] = time.time()
+        robot_states[robot_id]["packets"] += 1
+
+
+def make_sensor_dispatcher(robot_id: int) -> dispatcher.Dispatcher:
+    """
+    Create a dispatcher that routes /sensor messages to osc_sensor_handler for one robot.
+    """
+    disp = dispatcher.Dispatcher()
+    disp.map("/sensor", partial(osc_sensor_handler, robot_id))
+    return disp
+
+
+def setup_sensor_servers():
+    """
+    Create one OSC UDP server per robot for incoming /sensor messages.
+    """
+    servers = []
+
+    for robot_id in range(NUM_ROBOTS):
+        port = SENSOR_BASE_PORT + robot_id
+
+        disp = make_sensor_dispatcher(robot_id)
+
+        server = osc_server.ThreadingOSCUDPServer(("0.0.0.0", port), disp)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        servers.append(server)
+        logger.info(f"Listening for robot {robot_id} sensors on UDP port {port}")
+
+    return servers
+
+
+def setup_sensor_selector(reuse_port: bool = False) -> selectors.BaseSelector:
+    """
+    Bind one non-blocking UDP socket per robot (SENSOR_BASE_PORT + robot_id) and
+    register all of them with a single selector (epoll on Linux).
+
+    Each registration carries (robot_id, dispatcher) as its data, so the ingest
+    loop can route a datagram without any per-packet lookup.
+
+    With SENSOR_SINGLE_PORT set, a single socket is bound instead and registered
+    with (None, list of dispatchers); robots are then identified per datagram by
+    their source IP through robot_index_by_ip.
+
+    With reuse_port, sockets are bound with SO_REUSEPORT so several ingest
+    worker processes can bind the same port(s).
+    """
+    global robot_index_by_ip
+
+    sel = selectors.DefaultSelector()
+
+    if SENSOR_SINGLE_PORT is not None:
+        robot_index_by_ip = build_source_table(robot_ip_addresses())
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SENSOR_SOCKET_RCVBUF)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("0.0.0.0", SENSOR_SINGLE_PORT))
+        sock.setblocking(False)
+
+        dispatchers = [make_sensor_dispatcher(robot_id) for robot_id in range(NUM_ROBOTS)]
+        sel.register(sock, selectors.EVENT_READ, (None, dispatchers))
+        logger.info(
+            f"Listening for {NUM_ROBOTS} robots' sensors on UDP port {SENSOR_SINGLE_PORT} "
+            f"(selector, identified by source IP)"
+        )
+        return sel
+
+    for robot_id in range(NUM_ROBOTS):
+        port = SENSOR_BASE_PORT + robot_id
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("0.0.0.0", port))
+        sock.setblocking(False)
+
+        sel.register(sock, selectors.EVENT_READ, (robot_id, make_sensor_dispatcher(robot_id)))
+        logger.info(f"Listening for robot {robot_id} sensors on UDP port {port} (selector)")
+
+    return sel
+
+
+class DatagramBatch:
+    """
+    Preallocated receive buffers for draining one socket in a single pass.
+
+    Datagrams are received with recvfrom_into() straight into the fixed
+    bytearrays; `sizes` and `addresses` describe the first `count` entries.
+    """
+
+    def __init__(self, size: int = INGEST_BATCH_SIZE, buffer_size: int = INGEST_BUFFER_SIZE) -> None:
+        self.buffers = [bytearray(buffer_size) for _ in range(size)]
+        self.views = [memoryview(buf) for buf in self.buffers]
+        self.sizes = [0] * size
+        self.addresses = [None] * size
+        self.count = 0
+
+
+def drain_socket(sock: socket.socket, batch: DatagramBatch) -> int:
+    """
+    Receive every datagram queued on a non-blocking socket (until EAGAIN or the
+    batch is full) into the batch's buffers. Returns the number received.
+
+    If the batch fills up, the remaining datagrams stay queued and the selector
+    reports the socket as readable again on the next wakeup.
+    """
+    views = batch.views
+    sizes = batch.sizes
+    addresses = batch.addresses
+    limit = len(views)
+    count = 0
+
+    while count < limit:
+        try:
+            nbytes, client_address = sock.recvfrom_into(views[count])
+        except (BlockingIOError, InterruptedError):
+            break
+        sizes[count] = nbytes
+        addresses[count] = client_address
+        count += 1
+
+    batch.count = count
+    return count
+
+
+# The firmware always sends "/sensor" with type tag ",ii" and two int32 values:
+#   b"/sensor\0" (8 bytes) + b",ii\0" (4 bytes) + 2 x big-endian int32 (8 bytes)
+SENSOR_PACKET_PREFIX = b"/sensor\x00,ii\x00"
+SENSOR_ARGS_OFFSET = len(SENSOR_PACKET_PREFIX)
+SENSOR_PACKET_SIZE = SENSOR_ARGS_OFFSET + 8
+_sensor_args = struct.Struct(">ii")
+
+
+def handle_sensor_batch(robot_id: int, disp: dispatcher.Dispatcher, batch: DatagramBatch) -> None:
+    """
+    Handle every datagram of a drained batch, in arrival order.
+
+    With SENSOR_FAST_PATH, a datagram that matches the firmware's fixed /sensor
+    layout byte for byte is decoded with struct.unpack_from() and passed straight
+    to handle_sensor_values(). Anything else (bundles, other addresses or type
+    tags) goes through the robot's dispatcher and the full OSC parser.
+
+    With COALESCE_SENSOR_PACKETS, only the newest fast-path /sensor packet of
+    each run of them is handled; the older ones are stale after a stall, so
+    they are skipped (and counted in robot_buffer, and recorded in the event
+    log) instead of each producing a /motor send. A run ends at the end of the
+    batch or at a datagram that needs the dispatcher, which is handled after
+    the run's newest packet so replies keep arrival order.
+
+    An exception while handling one datagram is logged (handle_datagram_error())
+    and the rest of the batch is still handled.
+    """
+    buffers = batch.buffers
+    views = batch.views
+    sizes = batch.sizes
+    addresses = batch.addresses
+    unpack_from = _sensor_args.unpack_from
+    coalesce = COALESCE_SENSOR_PACKETS
+    events = event_log
+    newest = -1
+    skipped = 0
+
+    for i in range(batch.count):
+        nbytes = sizes[i]
+        buf = buffers[i]
+        if (SENSOR_FAST_PATH and nbytes == SENSOR_PACKET_SIZE
+                and buf.startswith(SENSOR_PACKET_PREFIX)):
+            if coalesce:
+                if newest >= 0:
+                    skipped += 1
+                    if events is not None:
+                        events.record(robot_id, EVENT_SENSOR_COALESCED,
+                                      *unpack_from(buffers[newest], SENSOR_ARGS_OFFSET))
+                newest = i
+                continue
+            left_sensor, right_sensor = unpack_from(buf, SENSOR_ARGS_OFFSET)
+            try:
+                handle_sensor_values(robot_id, float(left_sensor), float(right_sensor))
+            except Exception:
+                handle_datagram_error(robot_id, addresses[i])
+        else:
+            if newest >= 0:
+                handle_coalesced(robot_id, buffers[newest], skipped, addresses[newest])
+                newest = -1
+                skipped = 0
+            try:
+                disp.call_handlers_for_packet(bytes(views[i][:nbytes]), addresses[i])
+            except Exception:
+                handle_datagram_error(robot_id, addresses[i])
+
+    if newest >= 0:
+        handle_coalesced(robot_id, buffers[newest], skipped, addresses[newest])
+
+
+def handle_shared_port_batch(dispatchers: list, batch: DatagramBatch) -> None:
+    """
+    Like handle_sensor_batch(), for the single sensor port: each datagram's robot
+    is looked up by source IP in robot_index_by_ip (one dict lookup), and
+    datagrams from unknown sources are counted and dropped. Coalescing keeps
+    the newest fast-path /sensor packet per robot, handled before any later
+    dispatcher datagram of the same robot.
+    """
+    buffers = batch.buffers
+    views = batch.views
+    sizes = batch.sizes
+    addresses = batch.addresses
+    unpack_from = _sensor_args.unpack_from
+    lookup = robot_index_by_ip.get
+    coalesce = COALESCE_SENSOR_PACKETS
+    events = event_log
+    newest = {}
+
+    for i in range(batch.count):
+        client_address = addresses[i]
+        robot_id = lookup(client_address[0])
+        if robot_id is None:
+            note_unknown_source(client_address)
+            continue
+
+        nbytes = sizes[i]
+        buf = buffers[i]
+        if (SENSOR_FAST_PATH and nbytes == SENSOR_PACKET_SIZE
+                and buf.startswith(SENSOR_PACKET_PREFIX)):
+            if coalesce:
+                if robot_id in newest:
+                    robot_buffer.count_coalesced(robot_id, 1)
+                    if events is not None:
+                        events.record(robot_id, EVENT_SENSOR_COALESCED,
+                                      *unpack_from(buffers[newest[robot_id]], SENSOR_ARGS_OFFSET))
+                newest[robot_id] = i
+                continue
+            left_sensor, right_sensor = unpack_from(buf, SENSOR_ARGS_OFFSET)
+            try:
+                handle_sensor_values(robot_id, float(left_sensor), float(right_sensor))
+            except Exception:
+                handle_datagram_error(robot_id, client_address)
+        else:
+            held = newest.pop(robot_id, None)
+            if held is not None:
+                handle_coalesced(robot_id, buffers[held], 0, addresses[held])
+            try:
+                dispatchers[robot_id].call_handlers_for_packet(bytes(views[i][:nbytes]), client_address)
+            except Exception:
+                handle_datagram_error(robot_id, client_address)
+
+    for robot_id, i in newest.items():
+        handle_coalesced(robot_id, buffers[i], 0, addresses[i])
+
+
+def handle_coalesced(robot_id: int, buf: bytearray, skipped: int,
+                     client_address: tuple[str, int]) -> None:
+    """
+    Handle the newest fast-path /sensor packet `buf` of a coalesced run, after
+    counting the `skipped` older ones in robot_buffer.
+    """
+    if skipped:
+        robot_buffer.count_coalesced(robot_id, skipped)
+    left_sensor, right_sensor = _sensor_args.unpack_from(buf, SENSOR_ARGS_OFFSET)
+    try:
+        handle_sensor_values(robot_id, float(left_sensor), float(right_sensor))
+    except Exception:
+        handle_datagram_error(robot_id, client_address)
+
+
+def handle_datagram_error(robot_id: int, client_address: tuple[str, int]) -> None:
+    """
+    Log the exception raised while handling one datagram, with its traceback,
+    as socketserver's handle_error() does for the threaded servers: a bad
+    datagram costs only itself, and ingest goes on for every robot.
+    """
+    logger.exception(f"Error handling datagram from {client_address[0]}:{client_address[1]} (robot {robot_id})")
+
+
+def note_unknown_source(client_address: tuple[str, int]) -> None:
+    """
+    Count a datagram from an IP that is not in the robot table; warn once per IP.
+    """
+    global unknown_source_packets
+
+    unknown_source_packets += 1
+    ip = client_address[0]
+    if ip not in unknown_source_ips:
+        unknown_source_ips.add(ip)
+        logger.warning(f"Ignoring sensor data from unknown source {ip}:{client_address[1]}")
+
+
+def log_unknown_sources() -> None:
+    """
+    Shutdown summary of the datagrams dropped by note_unknown_source(), if any.
+    """
+    if unknown_source_packets:
+        logger.info(
+            f"Sensor datagrams from unknown sources dropped: {unknown_source_packets} "
+            f"(from {', '.join(sorted(unknown_source_ips))})"
+        )
+
+
+def selector_ingest_loop(sel: selectors.BaseSelector) -> None:
+    """
+    Receive loop for INGEST_MODE == "selector".
+
+    One thread waits on every sensor socket, drains all datagrams pending on a
+    ready socket in one pass, and calls the robot's dispatcher (and therefore
+    osc_sensor_handler) inline, so no thread is created per datagram.
+    """
+    global ingest_wakeups
+
+    batch = DatagramBatch()
+
+    while running:
+        for key, _ in sel.select(timeout=0.5):
+            robot_id, disp = key.data
+            ingest_wakeups += 1
+            try:
+                drain_socket(key.fileobj, batch)
+            except OSError as e:
+                port = key.fileobj.getsockname()[1]
+                logger.error(f"Sensor socket on port {port}: receive failed: {e}")
+                continue
+            if robot_id is None:
+                handle_shared_port_batch(disp, batch)
+            else:
+                handle_sensor_batch(robot_id, disp, batch)
+
+
+def close_sensor_selector(sel: selectors.BaseSelector) -> None:
+    """
+    Unregister and close every socket owned by a sensor selector.
+    """
+    for key in list(sel.get_map().values()):
+        sel.unregister(key.fileobj)
+        key.fileobj.close()
+    sel.close()
+
+
+def build_osc_template(address: str, num_int_args: int) -> tuple[bytearray, int]:
+    """
+    Encode an OSC message with `num_int_args` int32 arguments (all zero) once.
+
+    Returns the datagram as a bytearray and the byte offset of the first
+    argument, so the arguments can later be overwritten in place.
+    """
+    builder = osc_message_builder.OscMessageBuilder(address=address)
+    for _ in range(num_int_args):
+        builder.add_arg(0, "i")
+    dgram = bytearray(builder.build().dgram)
+    return dgram, len(dgram) - 4 * num_int_args
+
+
+_motor_args = struct.Struct(">ii")
+_led_args = struct.Struct(">iii")
+
+
+class MotorLink:
+    """
+    Sends /motor and /LED to one robot from pre-encoded packet templates.
+
+    /motor (20 bytes) and /LED (28 bytes) never change apart from their int32
+    arguments, so each link keeps one bytearray per message, patches the
+    argument slots with struct.pack_into() and passes the buffer to
+    `sender.sendto()`. `sender` is either a UDP socket or an asyncio datagram
+    transport; both take (data, address).
+
+    A link is not thread-safe: sendto() releases the GIL while the kernel
+    copies the shared bytearray, so a concurrent pack_into() could tear a
+    datagram. Each link must have one sender at a time. Under threaded ingest,
+    handle_sensor_values() sends under the robot's RobotBuffer row lock; the
+    other ingest modes send a robot's commands from a single thread (the
+    ingest or the tick thread). send_stop_signals() only runs once cleanup()
+    has stopped and joined all of those (stop_motor_senders()).
+
+    update_motor() / update_led() also remember the last values sent and skip
+    unchanged ones until their keepalive interval has passed (always for /LED,
+    for /motor only with MOTOR_SUPPRESS_UNCHANGED). Every /motor sent is
+    recorded in the event log under `robot_id`.
+    """
+
+    def __init__(self, sender, address: tuple[str, int], robot_id: int = 0) -> None:
+        self.sender = sender
+        self.address = address
+        self.robot_id = robot_id
+        self.motor_packet, self.motor_offset = build_osc_template("/motor", 2)
+        self.led_packet, self.led_offset = build_osc_template("/LED", 3)
+
+        self.last_left = self.last_right = None
+        self.motor_sent_at = 0.0
+        self.motor_suppressed = 0
+        self.last_led = None
+        self.led_sent_at = 0.0
+        self.led_suppressed = 0
+
+    def update_motor(self, left_motor: int, right_motor: int, now: float) -> None:
+        """
+        Send /motor unless MOTOR_SUPPRESS_UNCHANGED is set, the pair equals the
+        last one sent and MOTOR_KEEPALIVE_INTERVAL has not yet passed (`now` is
+        time.monotonic()).
+        """
+        if (MOTOR_SUPPRESS_UNCHANGED
+                and left_motor == self.last_left and right_motor == self.last_right
+                and now - self.motor_sent_at < MOTOR_KEEPALIVE_INTERVAL):
+            self.motor_suppressed += 1
+            return
+        self.send_motor(left_motor, right_motor)
+        self.last_left = left_motor
+        self.last_right = right_motor
+        self.motor_sent_at = now
+
+    def update_led(self, color: tuple[int, int, int], now: float) -> None:
+        """
+        Send /LED only if `color` changed or LED_KEEPALIVE_INTERVAL has passed.
+        """
+        if color == self.last_led and now - self.led_sent_at < LED_KEEPALIVE_INTERVAL:
+            self.led_suppressed += 1
+            return
+        self.send_led(*color)
+        self.last_led = color
+        self.led_sent_at = now
+
+    def send_motor(self, left_motor: int, right_motor: int) -> None:
+        _motor_args.pack_into(self.motor_packet, self.motor_offset, left_motor, right_motor)
+        self.sender.sendto(self.motor_packet, self.address)
+        events = event_log
+        if events is not None:
+            events.record(self.robot_id, EVENT_MOTOR, left_motor, right_motor)
+
+    def send_led(self, red: int, green: int, blue: int) -> None:
+        _led_args.pack_into(self.led_packet, self.led_offset, red, green, blue)
+        self.sender.sendto(self.led_packet, self.address)
+
+
+class ConnectedMotorLink(MotorLink):
+    """
+    MotorLink over a UDP socket that is connect()ed to the robot, so each
+    command is a plain send() with no destination address to convert.
+    """
+
+    def send_motor(self, left_motor: int, right_motor: int) -> None:
+        _motor_args.pack_into(self.motor_packet, self.motor_offset, left_motor, right_motor)
+        self.sender.send(self.motor_packet)
+        events = event_log
+        if events is not None:
+            events.record(self.robot_id, EVENT_MOTOR, left_motor, right_motor)
+
+    def send_led(self, red: int, green: int, blue: int) -> None:
+        _led_args.pack_into(self.led_packet, self.led_offset, red, green, blue)
+        self.sender.send(self.led_packet)
+
+
+def load_robot_registry(path: str) -> dict[int, str]:
+    """
+    Read a robot registry CSV with a header and "robot_id,ip" rows.
+    """
+    registry = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            robot_id = int(row["robot_id"])
+            if not 0 <= robot_id < NUM_ROBOTS:
+                raise ValueError(f"{path}: robot_id {robot_id} outside 0..{NUM_ROBOTS - 1}")
+            registry[robot_id] = row["ip"].strip()
+    return registry
+
+
+def robot_ip_addresses() -> list[str]:
+    """
+    IP address of every robot: from ROBOT_REGISTRY_FILE where listed, otherwise
+    from ROBOT_IP_TEMPLATE (filled with 50 + robot_id).
+    """
+    registry = load_robot_registry(ROBOT_REGISTRY_FILE) if ROBOT_REGISTRY_FILE else {}
+    return [
+        registry.get(robot_id, ROBOT_IP_TEMPLATE.format(50 + robot_id))
+        for robot_id in range(NUM_ROBOTS)
+    ]
+
+
+def build_source_table(ips: list[str]) -> dict[str, int]:
+    """
+    Map each robot's source IP to its index for single-port ingest.
+
+    Robots send from an ephemeral UDP port, so only the IP of the source
+    address is used as the key.
+    """
+    table = {}
+    for robot_id, ip in enumerate(ips):
+        ip = resolve_udp_address((ip, 0))[0]
+        if ip in table:
+            raise ValueError(f"Robots {table[ip]} and {robot_id} share source IP {ip}")
+        table[ip] = robot_id
+    return table
+
+
+def robot_motor_addresses() -> list[tuple[str, int]]:
+    """
+    (IP, port) of every robot's /motor listener, from robot_ip_addresses() and MOTOR_BASE_PORT.
+    """
+    return [
+        (ip, MOTOR_BASE_PORT + robot_id)
+        for robot_id, ip in enumerate(robot_ip_addresses())
+    ]
+
+
+def resolve_udp_address(address: tuple[str, int]) -> tuple[str, int]:
+    """
+    Resolve a (host, port) pair once to the numeric IPv4 sockaddr used by sendto().
+    """
+    return socket.getaddrinfo(*address, family=socket.AF_INET, type=socket.SOCK_DGRAM)[0][4]
+
+
+def setup_motor_clients(addresses: Optional[list[tuple[str, int]]] = None,
+                        transport: Optional[str] = None) -> list[MotorLink]:
+    """
+    Create one MotorLink per robot for outgoing /motor (and optional /LED) messages.
+
+    `addresses` defaults to robot_motor_addresses() and `transport` to
+    MOTOR_TRANSPORT ("per_robot", "shared" or "connected").
+    """
+    if addresses is None:
+        addresses = robot_motor_addresses()
+    if transport is None:
+        transport = MOTOR_TRANSPORT
+
+    shared_sock = None
+    if transport == "shared":
+        shared_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        shared_sock.setblocking(False)
+
+    clients = []
+    for robot_id, address in enumerate(addresses):
+        sockaddr = resolve_udp_address(address)
+        if transport == "shared":
+            link = MotorLink(shared_sock, sockaddr, robot_id)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            if transport == "connected":
+                sock.connect(sockaddr)
+                link = ConnectedMotorLink(sock, sockaddr, robot_id)
+            else:
+                link = MotorLink(sock, sockaddr, robot_id)
+        clients.append(link)
+        logger.info(
+            f"Motor client for robot {robot_id}: IP={address[0]}, port={address[1]} ({transport})"
+        )
+    return clients
+
+
+def log_send_summary(clients: list[MotorLink]) -> None:
+    """
+    Log how many unchanged /motor and /LED commands were not retransmitted.
+    """
+    motor_suppressed = sum(link.motor_suppressed for link in clients)
+    led_suppressed = sum(link.led_suppressed for link in clients)
+    if motor_suppressed or led_suppressed:
+        logger.info(
+            f"Unchanged commands suppressed: /motor {motor_suppressed}, /LED {led_suppressed}"
+        )
+
+
+def close_motor_clients(clients: list[MotorLink]) -> None:
+    """
+    Close the sockets behind a list of MotorLinks (each shared socket once).
+    """
+    for sock in {id(link.sender): link.sender for link in clients}.values():
+        sock.close()
+
+# -----------------------------------------------------------------------------
+# Tick-synchronous control (CONTROL_MODE == "tick")
+# -----------------------------------------------------------------------------
+
+def reset_tick_state(num_robots: int) -> None:
+    """
+    Allocate empty latest-reading arrays for num_robots robots.
+    """
+    global tick_left, tick_right, tick_received
+
+    tick_left = array("d", bytes(8 * num_robots))
+    tick_right = array("d", bytes(8 * num_robots))
+    tick_received = array("d", bytes(8 * num_robots))
+
+
+def run_control_tick(now: float) -> int:
+    """
+    One batched control step: calibrate, filter and predict the readings of
+    every robot with a reading younger than TICK_STALE_AFTER, compute motor
+    commands (one batch call per control law), shape, log and send them. Returns the number of robots driven.
+    """
+    # One consistent copy of every robot's latest (left, right, time)
+    with tick_lock:
+        received = np.frombuffer(tick_received, dtype=np.float64).copy()
+        all_left = np.frombuffer(tick_left, dtype=np.float64).copy()
+        all_right = np.frombuffer(tick_right, dtype=np.float64).copy()
+    fresh = (received > 0.0) & (now - received < TICK_STALE_AFTER)
+
+    commands = []
+    # Batch laws read M_max and alpha at call time; keep a swap out of the step
+    with params_lock:
+        for law, robot_ids in robot_law_groups:
+            active = robot_ids[fresh[robot_ids]]
+            if active.size == 0:
+                continue
+            left = all_left[active]
+            right = all_right[active]
+            law_left, law_right = left, right
+            if sensor_calibration is not None:
+                law_left, law_right = sensor_calibration.apply_batch(active, law_left, law_right)
+            if sensor_filter is not None:
+                law_left, law_right = sensor_filter.update_batch(
+                    active, law_left, law_right, received[active]
+                )
+            if sensor_predictor is not None:
+                sensor_predictor.update_batch(active, law_left, law_right, received[active])
+                law_left, law_right = sensor_predictor.predict_batch(
+                    active, now, 1.0 / CONTROL_RATE_HZ
+                )
+            requested_ML, requested_MR = law.batch(law_left, law_right)
+            if motor_shaper is not None:
+                ML, MR = motor_shaper.update_batch(active, requested_ML, requested_MR, now)
+            else:
+                ML, MR = requested_ML, requested_MR
+            commands.extend(zip(
+                active.tolist(), left.tolist(), right.tolist(), ML.tolist(), MR.tolist(),
+                np.asarray(law_left, dtype=np.float64).tolist(),
+                np.asarray(law_right, dtype=np.float64).tolist(),
+                requested_ML.tolist(), requested_MR.tolist(),
+            ))
+
+    if not commands:
+        return 0
+
+    with state_lock:
+        for robot_id, _, _, left_motor, right_motor, *_ in commands:
+            robot_states[robot_id]["motors"] = (left_motor, right_motor)
+
+    for command in commands:
+        robot_id, _, _, left_motor, right_motor = command[:5]
+        log_data_to_buffer(*command)
+        if robot_id >= len(motor_clients):
+            continue
+        link = motor_clients[robot_id]
+        try:
+            link.update_motor(left_motor, right_motor, now)
+            if LED_ENABLED:
+                link.update_led(LED_COLOR, now)
+        except Exception as e:
+            logger.error(f"Robot {robot_id}: failed to send OSC command: {e}")
+
+    return len(commands)
+
+
+class TickStats:
+    """
+    Lateness (jitter) and duration of control ticks, and overruns, between reports.
+
+    A tick overruns when its work takes longer than the tick period; ticks
+    whose deadline had already passed when the previous one finished are
+    skipped rather than run back to back, and counted separately.
+    """
+
+    def __init__(self, period: float) -> None:
+        self.period = period
+        self.next_report = time.monotonic() + STATS_INTERVAL
+        self.reset()
+
+    def reset(self) -> None:
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+        self.duration_sum = 0.0
+        self.duration_max = 0.0
+
+    def record(self, lateness: float, duration: float) -> None:
+        self.ticks += 1
+        self.lateness_sum += lateness
+        self.lateness_max = max(self.lateness_max, lateness)
+        self.duration_sum += duration
+        self.duration_max = max(self.duration_max, duration)
+        if duration > self.period:
+            self.overruns += 1
+
+    def maybe_report(self, now: float) -> None:
+        if now < self.next_report or not self.ticks:
+            return
+        logger.info(
+            f"Control ticks: {self.ticks} at {1.0 / self.period:.1f} Hz, "
+            f"jitter mean {1000.0 * self.lateness_sum / self.ticks:.2f} ms / "
+            f"max {1000.0 * self.lateness_max:.2f} ms, "
+            f"step mean {1000.0 * self.duration_sum / self.ticks:.2f} ms / "
+            f"max {1000.0 * self.duration_max:.2f} ms, "
+            f"{self.overruns} overruns, {self.skipped} skipped"
+        )
+        self.reset()
+        self.next_report = now + STATS_INTERVAL
+
+
+def next_tick_deadline(stats: TickStats, deadline: float, now: float) -> float:
+    """
+    Advance an absolute tick deadline by one period, skipping (and counting)
+    every deadline that has already passed.
+    """
+    deadline += stats.period
+    if now >= deadline:
+        missed = int((now - deadline) // stats.period) + 1
+        stats.skipped += missed
+        deadline += missed * stats.period
+    return deadline
+
+
+def control_tick_loop() -> None:
+    """
+    Background thread for tick mode: run_control_tick() on absolute
+    time.monotonic() deadlines every 1 / CONTROL_RATE_HZ seconds.
+    """
+    stats = TickStats(1.0 / CONTROL_RATE_HZ)
+    deadline = time.monotonic() + stats.period
+
+    while running:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        start = time.monotonic()
+        run_control_tick(start)
+        end = time.monotonic()
+
+        stats.record(start - deadline, end - start)
+        stats.maybe_report(end)
+        deadline = next_tick_deadline(stats, deadline, end)
+
+# -----------------------------------------------------------------------------
+# Monitoring and shutdown
+# -----------------------------------------------------------------------------
+
+class IngestStats:
+    """
+    Tracks handled /sensor packets per second and process CPU use between reports.
+
+    CPU use is process time (all threads) divided by wall time, so 100% means
+    one core fully busy. This makes the threaded and selector ingest modes
+    directly comparable under the same load.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.next_report = time.monotonic() + STATS_INTERVAL
+        self.last_wall = time.monotonic()
+        self.last_cpu = process_cpu_time()
+        self.last_packets = total_packets()
+        self.last_wakeups = ingest_wakeups
+        self.packets_per_wakeup = 0.0
+        self.last_coalesced = total_coalesced()
+        self.coalesced = 0
+        self.last_unknown = unknown_source_packets
+        self.unknown = 0
+
+    def sample(self) -> tuple[float, float]:
+        """
+        Return (packets_per_second, cpu_percent) since the previous sample.
+
+        Also updates `packets_per_wakeup` (selector ingest only, 0.0 otherwise),
+        `coalesced` (stale /sensor packets skipped since the previous sample)
+        and `unknown` (single-port datagrams from unknown sources since then).
+        """
+        wall = time.monotonic()
+        cpu = process_cpu_time()
+        packets = total_packets()
+        wakeups = ingest_wakeups
+
+        elapsed = max(wall - self.last_wall, 1e-9)
+        rate = (packets - self.last_packets) / elapsed
+        cpu_percent = 100.0 * (cpu - self.last_cpu) / elapsed
+        if wakeups > self.last_wakeups:
+            self.packets_per_wakeup = (packets - self.last_packets) / (wakeups - self.last_wakeups)
+        else:
+            self.packets_per_wakeup = 0.0
+
+        coalesced = total_coalesced()
+        self.coalesced = coalesced - self.last_coalesced
+        unknown = unknown_source_packets
+        self.unknown = unknown - self.last_unknown
+
+        self.last_wall, self.last_cpu, self.last_packets = wall, cpu, packets
+        self.last_wakeups = wakeups
+        self.last_coalesced = coalesced
+        self.last_unknown = unknown
+        return rate, cpu_percent
+
+
+def total_coalesced() -> int:
+    """
+    Number of stale /sensor packets skipped by coalescing, summed over all robots.
+    """
+    return sum(robot_buffer.coalesced(robot_id) for robot_id in range(NUM_ROBOTS))
+
+
+def process_cpu_time() -> float:
+    """
+    CPU time of this process plus the last reported CPU time of every ingest worker.
+    """
+    cpu = time.process_time()
+    if worker_cpu_times is not None:
+        cpu += sum(worker_cpu_times)
+    return cpu
+
+
+def total_packets() -> int:
+    """
+    Number of /sensor packets handled so far, summed over all robots.
+    """
+    with state_lock:
+        return sum(state["packets"] for state in robot_states.values())
+
+
+def check_robot_states(stats: IngestStats) -> None:
+    """
+    Warn about robots that have not sent data for several seconds, and report
+    ingest throughput and CPU use once every STATS_INTERVAL seconds.
+    """
+    if ingest_workers:
+        merge_worker_states()
+
+    now = time.time()
+    with state_lock:
+        for robot_id, state in robot_states.items():
+            last_update = state["last_update"]
+            if last_update > 0 and now - last_update > 5.0:
+                logger.warning(
+                    f"Robot {robot_id} has not sent data for {now - last_update:.1f} seconds"
+                )
+
+    if time.monotonic() >= stats.next_report:
+        rate, cpu_percent = stats.sample()
+        mode = INGEST_MODE if CONTROLLER_MODE == "threads" else CONTROLLER_MODE
+        if ingest_workers:
+            mode += f" x{len(ingest_workers)} workers"
+        batching = ""
+        if stats.packets_per_wakeup:
+            batching = f", {stats.packets_per_wakeup:.2f} packets/wakeup"
+        if stats.coalesced:
+            batching += f", {stats.coalesced} stale packets coalesced"
+        if stats.unknown:
+            batching += f", {stats.unknown} from unknown sources dropped"
+        logger.info(
+            f"Ingest ({mode}): {rate:.1f} packets/s, CPU {cpu_percent:.1f}%, "
+            f"{threading.active_count()} threads{batching}"
+        )
+        stats.next_report += STATS_INTERVAL
+
+
+def monitor_robot_states() -> None:
+    """
+    Background thread that calls check_robot_states() once per second.
+    """
+    stats = IngestStats()
+
+    while running:
+        check_robot_states(stats)
+        time.sleep(1.0)
+
+
+def send_stop_signals() -> None:
+    """
+    Send /motor [0, 0] (and /LED [0,0,0]) to all robots a few times to ensure they stop.
+    """
+    logger.info("Sending stop signals to all robots...")
+    for robot_id, link in enumerate(motor_clients):
+        try:
+            for _ in range(3):
+                link.send_motor(0, 0)
+                if LED_ENABLED:
+                    link.send_led(0, 0, 0)
+                time.sleep(0.01)
+            logger.info(f"Stop signal sent to robot {robot_id}")
+        except Exception as e:
+            logger.error(f"Failed to send stop signal to robot {robot_id}: {e}")
+
+
+def stop_motor_senders() -> None:
+    """
+    Stop every thread of this process that sends /motor and wait for it, so
+    the stop signals are the last commands sent and have their links to
+    themselves. `running` must already be False: the selector and tick loops
+    then return within one select timeout or tick period. The sensor servers
+    are shut down and closed, which also joins their in-flight handler threads.
+    """
+    # shutdown() waits up to a poll interval (0.5 s) for its server, so the
+    # servers are shut down side by side rather than one after another
+    stoppers = [threading.Thread(target=server.shutdown) for server in sensor_servers]
+    for stopper in stoppers:
+        stopper.start()
+    for stopper in stoppers:
+        stopper.join()
+    for server in sensor_servers:
+        server.server_close()
+
+    for thread in (ingest_thread, tick_thread):
+        if thread is None or thread is threading.current_thread():
+            continue
+        thread.join(max(2.0, 2.0 / CONTROL_RATE_HZ))
+        if thread.is_alive():
+            logger.warning(f"{thread.name} did not stop; stop signals may race its sends")
+
+
+def cleanup() -> None:
+    """
+    Clean shutdown: stop robots and close the log files.
+    """
+    global running
+
+    if not running:
+        return
+
+    running = False
+    logger.info("Shutting down controller...")
+
+    if ingest_workers:
+        stop_ingest_workers()
+    stop_motor_senders()
+
+    log_send_summary(motor_clients)
+
+    try:
+        send_stop_signals()
+    except Exception:
+        pass
+
+    if frame_clock is not None:
+        logger.info(f"Log frames: {frame_clock.written} written, {frame_clock.missed} missed")
+
+    try:
+        close_log_files()
+        close_event_log()
+    except Exception as e:
+        logger.error(f"Error while closing log files: {e}")
+
+    coalesced = {
+        robot_id: robot_buffer.coalesced(robot_id)
+        for robot_id in range(NUM_ROBOTS)
+        if robot_buffer.coalesced(robot_id)
+    }
+    if coalesced:
+        logger.info(f"Stale /sensor packets coalesced per robot: {coalesced}")
+    log_unknown_sources()
+
+    if robot_buffer_shm is not None:
+        release_shared_robot_buffer()
+
+    logger.info("Shutdown complete.")
+
+
+def signal_handler(sig, frame) -> None:
+    """
+    Handle Ctrl+C (SIGINT) to perform a clean shutdown.
+    """
+    logger.info("SIGINT received, shutting down...")
+    cleanup()
+    sys.exit(0)
+
+# -----------------------------------------------------------------------------
+# Multi-process ingest (INGEST_WORKERS > 0)
+# -----------------------------------------------------------------------------
+
+def start_ingest_workers(count: int, log_stem: str) -> None:
+    """
+    Fork `count` ingest worker processes that share one robot_buffer. With
+    EVENT_LOG, each worker writes its own event log under `log_stem`.
+
+    robot_buffer is moved into a shared memory block first, so every worker
+    writes its robots' rows there and this process can still build complete
+    24 fps frames. Each worker binds the sensor socket(s) with SO_REUSEPORT;
+    the kernel hashes each robot's flow to one worker, so a robot's packets
+    are always handled in order by the same process.
+    """
+    global robot_buffer, robot_buffer_shm, ingest_stop, worker_cpu_times, shared_params
+
+    ctx = multiprocessing.get_context("fork")
+
+    robot_buffer_shm = shared_memory.SharedMemory(
+        create=True, size=8 * NUM_ROBOTS * ROBOT_BUFFER_FIELDS
+    )
+    robot_buffer = RobotBuffer(NUM_ROBOTS, robot_buffer_shm.buf)
+    ingest_stop = ctx.Event()
+    worker_cpu_times = ctx.Array("d", count, lock=False)
+    shared_params = ctx.Array("d", [param_epoch, MOTOR_MAX_OUTPUT, SIGMOID_ALPHA], lock=False)
+
+    for worker_index in range(count):
+        process = ctx.Process(
+            target=ingest_worker_main,
+            args=(worker_index, ingest_stop, worker_cpu_times, log_stem),
+            name=f"johnbot2-ingest-{worker_index}",
+            daemon=True,
+        )
+        process.start()
+        ingest_workers.append(process)
+        logger.info(f"Started ingest worker {worker_index} (pid {process.pid})")
+
+
+def ingest_worker_main(worker_index: int, stop, cpu_times, log_stem: str) -> None:
+    """
+    Entry point of a forked ingest worker: own motor sockets, own SO_REUSEPORT
+    sensor socket(s), own event log, and the usual selector loop until `stop`
+    is set.
+    """
+    global motor_clients
+
+    # Ctrl+C reaches the whole process group; the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if EVENT_LOG:
+        setup_event_log(log_stem, worker_index)
+    motor_clients = setup_motor_clients()
+    sel = setup_sensor_selector(reuse_port=True)
+
+    watcher = threading.Thread(
+        target=watch_worker_stop, args=(worker_index, stop, cpu_times), daemon=True
+    )
+    watcher.start()
+
+    if CONTROL_MODE == "tick":
+        # Each worker drives the robots whose packets the kernel hashes to it
+        threading.Thread(target=control_tick_loop, daemon=True).start()
+
+    try:
+        selector_ingest_loop(sel)
+    finally:
+        close_sensor_selector(sel)
+        log_unknown_sources()
+        log_send_summary(motor_clients)
+        close_motor_clients(motor_clients)
+        close_event_log()
+
+
+def watch_worker_stop(worker_index: int, stop, cpu_times) -> None:
+    """
+    Every 0.2 s: publish this worker's CPU time and pick up parameter updates
+    made in the main process. End the ingest loop when `stop` is set.
+    """
+    global running
+
+    while not stop.wait(0.2):
+        cpu_times[worker_index] = time.process_time()
+
+        epoch, motor_max, alpha = shared_params[:]
+        if int(epoch) != param_epoch:
+            apply_control_params(
+                int(motor_max) if motor_max.is_integer() else motor_max,
+                int(alpha) if alpha.is_integer() else alpha,
+                epoch=int(epoch),
+            )
+    running = False
+
+
+def stop_ingest_workers() -> None:
+    """
+    Ask every ingest worker to stop and wait for it (terminating stragglers).
+    """
+    ingest_stop.set()
+    for process in ingest_workers:
+        process.join(timeout=3.0)
+        if process.is_alive():
+            logger.warning(f"Ingest worker {process.name} did not stop, terminating")
+            process.terminate()
+    logger.info(f"Stopped {len(ingest_workers)} ingest workers")
+    ingest_workers.clear()
+
+
+def release_shared_robot_buffer() -> None:
+    """
+    Swap robot_buffer back to a private buffer and free the shared memory block.
+    """
+    global robot_buffer, robot_buffer_shm
+
+    shared = robot_buffer
+    robot_buffer = RobotBuffer(NUM_ROBOTS)
+    robot_buffer_shm.unlink()
+    try:
+        shared.release()
+        robot_buffer_shm.close()
+    except BufferError:
+        # A reader still holds a view; the mapping is freed at process exit
+        pass
+    robot_buffer_shm = None
+
+
+def merge_worker_states() -> None:
+    """
+    Copy last update time and packet count of every robot from the shared
+    robot_buffer into robot_states, for the staleness monitor and stats.
+    """
+    with state_lock:
+        for robot_id, state in robot_states.items():
+            last_update, packets = robot_buffer.updates(robot_id)
+            state["last_update"] = last_update
+            state["packets"] = packets
+
+# -----------------------------------------------------------------------------
+# asyncio controller (CONTROLLER_MODE == "asyncio")
+# -----------------------------------------------------------------------------
+
+async def setup_async_motor_clients() -> tuple[asyncio.DatagramTransport, list]:
+    """
+    Create one unconnected datagram transport and a MotorLink per robot on top of it.
+    """
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, family=socket.AF_INET
+    )
+
+    clients = []
+    for robot_id, address in enumerate(robot_motor_addresses()):
+        clients.append(MotorLink(transport, resolve_udp_address(address), robot_id))
+        logger.info(
+            f"Motor client for robot {robot_id}: IP={address[0]}, port={address[1]} (asyncio)"
+        )
+    return transport, clients
+
+
+async def setup_async_sensor_servers() -> list:
+    """
+    Create one AsyncIOOSCUDPServer endpoint per robot on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    transports = []
+
+    for robot_id in range(NUM_ROBOTS):
+        port = SENSOR_BASE_PORT + robot_id
+        server = osc_server.AsyncIOOSCUDPServer(
+            ("0.0.0.0", port), make_sensor_dispatcher(robot_id), loop
+        )
+        transport, _ = await server.create_serve_endpoint()
+        transports.append(transport)
+        logger.info(f"Listening for robot {robot_id} sensors on UDP port {port} (asyncio)")
+
+    return transports
+
+
+async def async_csv_logging() -> None:
+    """
+    Coroutine counterpart of csv_logging_thread(): same deadlines, same frames.
+    """
+    global frame_clock
+    frame_clock = clock = FrameClock()
+
+    while running:
+        now_ns = time.monotonic_ns()
+        frame_index = clock.next_frame(now_ns)
+        if frame_index is None:
+            await asyncio.sleep((clock.deadline_ns(clock.next_index) - now_ns) / 1e9)
+            continue
+        write_frame_to_csv(frame_index)
+        clock.maybe_report(now_ns)
+
+
+async def async_control_tick_loop() -> None:
+    """
+    Coroutine counterpart of control_tick_loop().
+    """
+    stats = TickStats(1.0 / CONTROL_RATE_HZ)
+    deadline = time.monotonic() + stats.period
+
+    while running:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        start = time.monotonic()
+        run_control_tick(start)
+        end = time.monotonic()
+
+        stats.record(start - deadline, end - start)
+        stats.maybe_report(end)
+        deadline = next_tick_deadline(stats, deadline, end)
+
+
+async def async_monitor_robot_states() -> None:
+    """
+    Coroutine counterpart of monitor_robot_states().
+    """
+    stats = IngestStats()
+
+    while running:
+        check_robot_states(stats)
+        await asyncio.sleep(1.0)
+
+
+async def run_async_controller() -> None:
+    """
+    Run the whole controller on one event loop until SIGINT.
+
+    Every handler runs on the loop thread, so state_lock and tick_lock are
+    replaced with no-op context managers. Frames are still written by the log
+    writer thread.
+    """
+    global motor_clients, state_lock, tick_lock
+
+    state_lock = tick_lock = nullcontext()
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    try:
+        loop.add_signal_handler(signal.SIGINT, stop.set)
+    except NotImplementedError:
+        # Windows event loops do not support add_signal_handler
+        signal.signal(signal.SIGINT, lambda sig, frame: loop.call_soon_threadsafe(stop.set))
+
+    motor_transport, motor_clients = await setup_async_motor_clients()
+    sensor_transports = await setup_async_sensor_servers()
+
+    if CONFIG_PORT is not None:
+        start_config_server()
+
+    tasks = [
+        asyncio.create_task(async_monitor_robot_states()),
+        asyncio.create_task(async_csv_logging()),
+    ]
+    if CONTROL_MODE == "tick":
+        tasks.append(asyncio.create_task(async_control_tick_loop()))
+
+    logger.info("Controller is running (asyncio). Press Ctrl+C to stop.")
+
+    try:
+        await stop.wait()
+        logger.info("SIGINT received, shutting down...")
+    finally:
+        for transport in sensor_transports:
+            transport.close()
+        cleanup()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        motor_transport.close()
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, signal_handler)
+
+    logger.info("Starting johnbot2 controller")
+    logger.info(
+        f"Phototaxis mapping: M_max={MOTOR_MAX_OUTPUT}, alpha={SIGMOID_ALPHA}, "
+        f"{NUM_ROBOTS} robots"
+    )
+    if CONTROL_MODE == "tick":
+        logger.info(f"Tick-synchronous control at {CONTROL_RATE_HZ:g} Hz")
+
+    if SENSOR_SINGLE_PORT is not None and (CONTROLLER_MODE, INGEST_MODE) != ("threads", "selector"):
+        raise ValueError('SENSOR_SINGLE_PORT requires CONTROLLER_MODE = "threads" and INGEST_MODE = "selector"')
+    if MOTOR_LOOKUP_TABLE:
+        rebuild_motor_table()
+    setup_calibration()
+    setup_sensor_filter(NUM_ROBOTS)
+    setup_sensor_predictor(NUM_ROBOTS)
+    setup_motor_shaper(NUM_ROBOTS)
+
+    # All log files of this run share one name stem (ingest workers write
+    # their own event logs under it)
+    log_stem = new_log_stem()
+
+    if INGEST_WORKERS > 0:
+        if (CONTROLLER_MODE, INGEST_MODE) != ("threads", "selector"):
+            raise ValueError('INGEST_WORKERS requires CONTROLLER_MODE = "threads" and INGEST_MODE = "selector"')
+        if not hasattr(socket, "SO_REUSEPORT") or not hasattr(os, "fork"):
+            raise ValueError("INGEST_WORKERS requires SO_REUSEPORT and fork() (Linux)")
+
+        # Fork before any file or thread is created in this process
+        start_ingest_workers(INGEST_WORKERS, log_stem)
+
+    # Set up CSV logging, and the event log of this process. With ingest
+    # workers every packet is handled in a worker, so only they log events
+    setup_csv_logging(stem=log_stem)
+    if EVENT_LOG and INGEST_WORKERS == 0:
+        setup_event_log(log_stem)
+
+    if CONTROLLER_MODE == "asyncio":
+        asyncio.run(run_async_controller())
+        sys.exit(0)
+
+    # Set up OSC servers and clients
+    motor_clients = setup_motor_clients()
+    if INGEST_MODE == "selector":
+        # With INGEST_WORKERS, the worker processes started above own the sockets
+        if INGEST_WORKERS == 0:
+            sensor_selector = setup_sensor_selector()
+            ingest_thread = threading.Thread(
+                target=selector_ingest_loop, args=(sensor_selector,), name="sensor-ingest", daemon=True
+            )
+            ingest_thread.start()
+    else:
+        sensor_servers = setup_sensor_servers()
+
+    if CONFIG_PORT is not None:
+        config_server = start_config_server()
+
+    # Start background threads
+    monitor_thread = threading.Thread(target=monitor_robot_states, daemon=True)
+    monitor_thread.start()
+
+    csv_thread = threading.Thread(target=csv_logging_thread, daemon=True)
+    csv_thread.start()
+
+    if CONTROL_MODE == "tick" and INGEST_WORKERS == 0:
+        tick_thread = threading.Thread(target=control_tick_loop, name="control-tick", daemon=True)
+        tick_thread.start()
 
     logger.info("Controller is running. Press Ctrl+C to stop.")
 
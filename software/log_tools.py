@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+"""
+johnbot2 log tools
+
+Offline utilities for the logs written by johnbot2.py. Every command reads
+both the CSV and the binary (.bin) log format, plain or compressed (.gz, .xz),
+and a segment manifest (*.manifest.json) as one log.
+
+Usage:
+    python log_tools.py recompute LOG.csv [--law NAME | --motor-max M --alpha A]
+                                          [--calibration CAL.csv] [--output OUT.csv]
+    python log_tools.py fit-calibration LOG.csv [LOG.csv ...] [--output CAL.csv]
+    python log_tools.py eval-prediction LOG.csv [LOG.csv ...] [--horizons S [S ...]]
+                                        [--alpha A] [--beta B]
+    python log_tools.py events LOG.events [LOG_w0.events ...] [--output EVENTS.csv]
+
+eval-prediction also takes event logs (*.events), whose readings are not
+thinned to one per frame.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import lzma
+import math
+import os
+import re
+from functools import partial
+from typing import Optional
+
+import numpy as np
+
+import johnbot2
+
+# -----------------------------------------------------------------------------
+# Loading
+# -----------------------------------------------------------------------------
+
+def read_log_bytes(path: str) -> bytes:
+    """
+    Whole content of a log file, decompressing .gz / .xz. A compressed stream
+    cut short (controller killed, or an lzma segment never closed) yields
+    what could be decompressed.
+    """
+    if path.endswith(".gz"):
+        opener = gzip.open
+    elif path.endswith(".xz"):
+        opener = lzma.open
+    else:
+        with open(path, "rb") as f:
+            return f.read()
+    chunks = []
+    with opener(path, "rb") as f:
+        try:
+            # read1() returns what each underlying read decompresses to, so
+            # a truncated stream loses at most its unfinished tail
+            while chunk := f.read1(1 << 16):
+                chunks.append(chunk)
+        except (EOFError, lzma.LZMAError, OSError):
+            pass
+    return b"".join(chunks)
+
+
+def load_csv_log(path: str) -> tuple[list[str], np.ndarray]:
+    """
+    Load a johnbot2 CSV log as (column names, float64 array of shape (frames, columns)).
+    """
+    if not path.endswith((".gz", ".xz")):
+        with open(path, newline="") as f:
+            columns = next(csv.reader(f))
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        return columns, data
+
+    text = read_log_bytes(path).decode("ascii")
+    # Drop a row cut short at the end of a truncated stream
+    text = text[:text.rfind("\n") + 1]
+    if not text:
+        return [], np.empty((0, 0))
+    header, _, rows = text.partition("\n")
+    columns = next(csv.reader([header]))
+    if not rows:
+        return columns, np.empty((0, len(columns)))
+    return columns, np.loadtxt(io.StringIO(rows), delimiter=",", ndmin=2)
+
+
+def parse_binary_header(path: str, line: bytes,
+                        log_format: str = johnbot2.BINARY_LOG_FORMAT) -> dict:
+    try:
+        header = json.loads(line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != log_format:
+        kind = "event" if log_format == johnbot2.EVENT_LOG_FORMAT else "binary"
+        raise ValueError(f"{path}: not a johnbot2 {kind} log")
+    return header
+
+
+def read_binary_header(path: str, log_format: str = johnbot2.BINARY_LOG_FORMAT) -> tuple[dict, int]:
+    """
+    Return (header, size of the header line in bytes) of an uncompressed binary
+    (or, with `log_format`, event) log.
+    """
+    with open(path, "rb") as f:
+        line = f.readline()
+    return parse_binary_header(path, line, log_format), len(line)
+
+
+def load_binary_log(path: str, log_format: str = johnbot2.BINARY_LOG_FORMAT) -> np.ndarray:
+    """
+    Load a johnbot2 binary log as a structured array, one record per frame,
+    with a single numpy.fromfile (numpy.frombuffer after decompressing a .gz
+    or .xz log). A record cut short (controller killed mid-write) is dropped.
+    Event logs load the same way with log_format=johnbot2.EVENT_LOG_FORMAT.
+    """
+    if path.endswith((".gz", ".xz")):
+        content = read_log_bytes(path)
+        offset = content.index(b"\n") + 1
+        header = parse_binary_header(path, content[:offset], log_format)
+        dtype = np.dtype([(name, dtype) for name, dtype in header["columns"]])
+        count = (len(content) - offset) // dtype.itemsize
+        return np.frombuffer(content, dtype=dtype, count=count, offset=offset)
+
+    header, offset = read_binary_header(path, log_format)
+    dtype = np.dtype([(name, dtype) for name, dtype in header["columns"]])
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    return np.fromfile(path, dtype=dtype, count=count, offset=offset)
+
+
+def is_binary_log(path: str) -> bool:
+    if path.endswith((".gz", ".xz")):
+        opener = gzip.open if path.endswith(".gz") else lzma.open
+        try:
+            with opener(path, "rb") as f:
+                return f.read(1) == b"{"
+        except (EOFError, lzma.LZMAError, OSError):
+            return False
+    with open(path, "rb") as f:
+        return f.read(1) == b"{"
+
+
+def manifest_segments(path: str) -> list[str]:
+    """
+    Paths of the segments listed in a segment manifest, in order.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != johnbot2.LOG_MANIFEST_FORMAT:
+        raise ValueError(f"{path}: not a johnbot2 segment manifest")
+    if not manifest["complete"]:
+        print(f"{path}: log was not closed cleanly; the last segment may be truncated")
+    directory = os.path.dirname(path)
+    return [os.path.join(directory, segment["file"]) for segment in manifest["segments"]]
+
+
+def load_log(path: str) -> tuple[list[str], np.ndarray]:
+    """
+    Load a CSV or binary log, plain or compressed, or all segments of a
+    segment manifest, as (column names, float64 array of shape (frames, columns)).
+    """
+    if path.endswith(".manifest.json"):
+        # A segment opened just before a crash may hold no header yet
+        parts = [part for part in map(load_log, manifest_segments(path)) if part[0]]
+        if not parts:
+            raise ValueError(f"{path}: no readable segments")
+        columns = parts[0][0]
+        if any(part_columns != columns for part_columns, _ in parts):
+            raise ValueError(f"{path}: segments have different columns")
+        return columns, np.concatenate([data for _, data in parts])
+
+    if not is_binary_log(path):
+        return load_csv_log(path)
+    records = load_binary_log(path)
+    columns = list(records.dtype.names)
+    data = np.empty((records.size, len(columns)))
+    for index, name in enumerate(columns):
+        data[:, index] = records[name]
+    return columns, data
+
+
+def is_event_log(path: str) -> bool:
+    return path.removesuffix(".gz").removesuffix(".xz").endswith(".events")
+
+
+def event_log_header(path: str) -> dict:
+    if path.endswith(".gz"):
+        opener = gzip.open
+    elif path.endswith(".xz"):
+        opener = lzma.open
+    else:
+        opener = open
+    with opener(path, "rb") as f:
+        line = f.readline()
+    return parse_binary_header(path, line, johnbot2.EVENT_LOG_FORMAT)
+
+
+def load_event_log(paths: list[str]) -> np.ndarray:
+    """
+    Load one or more event logs (the main process's and each ingest worker's
+    of a run) as one structured array in time order, with a float64
+    "timestamp" field added: the event time on the time.time() scale of the
+    frame logs' timestamp column.
+    """
+    parts = []
+    for path in paths:
+        origin = event_log_header(path)["clock_origin"]
+        records = load_binary_log(path, johnbot2.EVENT_LOG_FORMAT)
+        parts.append((records, origin["time_ns"] - origin["monotonic_ns"]))
+
+    dtype = np.dtype(parts[0][0].dtype.descr + [("timestamp", "<f8")])
+    events = np.empty(sum(records.size for records, _ in parts), dtype=dtype)
+    start = 0
+    for records, wall_offset in parts:
+        chunk = events[start:start + records.size]
+        for name in records.dtype.names:
+            chunk[name] = records[name]
+        chunk["timestamp"] = (records["t_ns"] + wall_offset) / 1e9
+        start += records.size
+    return events[np.argsort(events["t_ns"], kind="stable")]
+
+
+def robot_columns(columns: list[str]) -> dict[int, dict[str, int]]:
+    """
+    Map robot id -> {field name: column index} from a log header
+    (columns named "robot<id>_<field>").
+    """
+    robots = {}
+    for index, name in enumerate(columns):
+        match = re.fullmatch(r"robot(\d+)_(\w+)", name)
+        if match:
+            robots.setdefault(int(match.group(1)), {})[match.group(2)] = index
+    return robots
+
+
+def robot_present(data: np.ndarray, fields: dict[str, int]) -> np.ndarray:
+    """
+    Boolean mask of frames in which a robot had recent data.
+
+    The logger writes all-zero sensor and motor values for robots without a
+    recent update; the control law never maps (0, 0) to motors (0, 0).
+    """
+    values = data[:, [fields["sensor_left"], fields["sensor_right"],
+                      fields["motor_left"], fields["motor_right"]]]
+    return np.any(values != 0.0, axis=1)
+
+# -----------------------------------------------------------------------------
+# Re-computation of the control law
+# -----------------------------------------------------------------------------
+
+def recompute_motors(columns: list[str],
+                     data: np.ndarray,
+                     law_for,
+                     frames: Optional[np.ndarray] = None,
+                     calibration=None) -> tuple[np.ndarray, dict[int, int]]:
+    """
+    Re-run a control law over every robot's logged sensor values with the
+    batch form of law_for(robot_id) (a johnbot2.ControlLaw), in all frames
+    or only where the boolean mask `frames` is set. The logged (raw) readings
+    go through `calibration` (a johnbot2.SensorCalibration) first, if given.
+    Logs written with SENSOR_FILTER carry the law's actual input as
+    filtered_left/right; those are used as they are. Logs written with motor
+    shaping carry the law's output as requested_left/right, which is then
+    what gets compared and replaced (motor_left/right hold the shaped values).
+
+    Returns a copy of `data` with the motor columns replaced (frames without
+    recent data are left at zero) and, per robot, the number of frames whose
+    recomputed motors differ from the logged ones.
+    """
+    result = data.copy()
+    mismatches = {}
+
+    for robot_id, fields in sorted(robot_columns(columns).items()):
+        present = robot_present(data, fields)
+        if frames is not None:
+            present &= frames
+        if "filtered_left" in fields:
+            left = data[present, fields["filtered_left"]]
+            right = data[present, fields["filtered_right"]]
+        else:
+            left = data[present, fields["sensor_left"]]
+            right = data[present, fields["sensor_right"]]
+            if calibration is not None:
+                left, right = calibration.apply_batch(np.full(left.size, robot_id), left, right)
+        ML, MR = law_for(robot_id).batch(left, right)
+        output = "requested" if "requested_left" in fields else "motor"
+        logged_ML = data[present, fields[f"{output}_left"]]
+        logged_MR = data[present, fields[f"{output}_right"]]
+        mismatches[robot_id] = int(np.count_nonzero((ML != logged_ML) | (MR != logged_MR)))
+
+        result[present, fields[f"{output}_left"]] = ML
+        result[present, fields[f"{output}_right"]] = MR
+
+    return result, mismatches
+
+
+def param_epochs(columns: list[str], data: np.ndarray) -> list[tuple[np.ndarray, float, float]]:
+    """
+    Split a log written with CONFIG_PORT set into (frame mask, M_max, alpha)
+    per parameter epoch; [] for logs without the parameter columns.
+    """
+    if "param_epoch" not in columns:
+        return []
+
+    epoch = data[:, columns.index("param_epoch")]
+    motor_max = data[:, columns.index("motor_max")]
+    alpha = data[:, columns.index("sigmoid_alpha")]
+    segments = []
+    for value in np.unique(epoch):
+        frames = epoch == value
+        first = np.flatnonzero(frames)[0]
+        segments.append((frames, motor_max[first], alpha[first]))
+    return segments
+
+
+def write_csv_log(path: str, columns: list[str], data: np.ndarray) -> None:
+    """
+    Write an array back in the controller's CSV layout (frame index and motor
+    columns as integers).
+    """
+    int_columns = {
+        index for index, name in enumerate(columns)
+        if name == "frame_index"
+        or name.endswith(("_motor_left", "_motor_right", "_requested_left", "_requested_right"))
+    }
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in data.tolist():
+            writer.writerow(
+                int(value) if index in int_columns else value
+                for index, value in enumerate(row)
+            )
+
+
+def recompute_by_epoch(columns: list[str],
+                       data: np.ndarray,
+                       calibration=None) -> tuple[np.ndarray, dict[int, int]]:
+    """
+    recompute_motors() with the configured laws, applying the M_max / alpha
+    logged for each parameter epoch to that epoch's frames.
+
+    Frames written just after a swap may still hold motors computed before it
+    (the logger samples each robot's latest reading), so a few mismatches
+    around each swap are expected.
+    """
+    result = data.copy()
+    mismatches = dict.fromkeys(robot_columns(columns), 0)
+    johnbot2.MOTOR_LOOKUP_TABLE = False  # only the batch forms are used
+
+    for frames, motor_max, alpha in param_epochs(columns, data):
+        johnbot2.apply_control_params(
+            int(motor_max) if motor_max.is_integer() else motor_max,
+            int(alpha) if alpha.is_integer() else alpha,
+        )
+        part, part_mismatches = recompute_motors(
+            columns, data, johnbot2.control_law_for, frames, calibration
+        )
+        result[frames] = part[frames]
+        for robot_id, count in part_mismatches.items():
+            mismatches[robot_id] += count
+
+    return result, mismatches
+
+
+def cmd_recompute(args) -> None:
+    columns, data = load_log(args.log)
+    epochs = param_epochs(columns, data)
+
+    calibration_file = args.calibration or johnbot2.CALIBRATION_FILE
+    calibration = None
+    if calibration_file:
+        num_robots = max(robot_columns(columns), default=-1) + 1
+        calibration = johnbot2.load_calibration(calibration_file, num_robots)
+
+    if args.motor_max is not None or args.alpha is not None:
+        # The paper's law with other parameters, for every robot
+        motor_max = args.motor_max if args.motor_max is not None else johnbot2.MOTOR_MAX_OUTPUT
+        alpha = args.alpha if args.alpha is not None else johnbot2.SIGMOID_ALPHA
+        law = johnbot2.ControlLaw(
+            f"phototaxis (M_max={motor_max}, alpha={alpha})",
+            None,
+            partial(johnbot2.map_sensors_to_motors_batch, motor_max=motor_max, alpha=alpha),
+        )
+        law_for = lambda robot_id: law
+        result, mismatches = recompute_motors(columns, data, law_for, calibration=calibration)
+    elif args.law is not None:
+        law = johnbot2.get_control_law(args.law)
+        law_for = lambda robot_id: law
+        result, mismatches = recompute_motors(columns, data, law_for, calibration=calibration)
+    elif epochs:
+        # Logged with CONFIG_PORT: the configured laws, with each epoch's parameters
+        law_for = johnbot2.control_law_for
+        result, mismatches = recompute_by_epoch(columns, data, calibration)
+    else:
+        # The laws configured in johnbot2.py (DEFAULT_CONTROL_LAW / ROBOT_CONTROL_LAWS)
+        law_for = johnbot2.control_law_for
+        result, mismatches = recompute_motors(columns, data, law_for, calibration=calibration)
+
+    epochs_note = f", {len(epochs)} parameter epochs" if epochs else ""
+    calibration_note = f", calibration {calibration_file}" if calibration_file else ""
+    print(f"{args.log}: {len(data)} frames{epochs_note}{calibration_note}")
+    for robot_id, count in mismatches.items():
+        print(f"  robot{robot_id} ({law_for(robot_id).name}): "
+              f"{count} frames differ from the logged motors")
+
+    if args.output:
+        write_csv_log(args.output, columns, result)
+        print(f"Recomputed log written to {args.output}")
+
+# -----------------------------------------------------------------------------
+# Sensor calibration fit
+# -----------------------------------------------------------------------------
+
+CALIBRATION_FIELDS = ["robot_id", "left_gain", "left_offset", "right_gain", "right_offset"]
+
+
+def collect_sensor_readings(paths: list[str]) -> dict[tuple[int, str], np.ndarray]:
+    """
+    Every logged raw reading per (robot id, "left" / "right"), over all logs,
+    from frames in which the robot had recent data.
+    """
+    readings = {}
+    for path in paths:
+        columns, data = load_log(path)
+        for robot_id, fields in robot_columns(columns).items():
+            present = robot_present(data, fields)
+            for side in ("left", "right"):
+                readings.setdefault((robot_id, side), []).append(
+                    data[present, fields[f"sensor_{side}"]]
+                )
+    return {key: np.concatenate(parts) for key, parts in readings.items()}
+
+
+def fit_calibration(readings: dict[tuple[int, str], np.ndarray],
+                    quantiles: tuple[float, float],
+                    min_frames: int) -> dict[int, tuple[float, float, float, float]]:
+    """
+    Fit gain and offset for every sensor by quantile matching.
+
+    Over a long run every sensor of the swarm sees the same distribution of
+    light, so each sensor's low and high quantiles are mapped linearly onto
+    those of all sensors pooled. Quantiles rather than mean and spread keep
+    the fit insensitive to readings clipped at 0 or SENSOR_MAX_VALUE.
+    Sensors with fewer than min_frames readings, or without spread, keep
+    gain 1 and offset 0.
+
+    Returns robot id -> (left_gain, left_offset, right_gain, right_offset).
+    """
+    pooled = np.concatenate(list(readings.values()))
+    ref_low, ref_high = np.quantile(pooled, quantiles)
+
+    coefficients = {}
+    for (robot_id, side), values in sorted(readings.items()):
+        gain, offset = 1.0, 0.0
+        if values.size >= min_frames:
+            low, high = np.quantile(values, quantiles)
+            if high - low >= 1.0:
+                gain = float((ref_high - ref_low) / (high - low))
+                offset = float(ref_low - gain * low)
+        left_right = coefficients.setdefault(robot_id, [1.0, 0.0, 1.0, 0.0])
+        index = 0 if side == "left" else 2
+        left_right[index:index + 2] = [gain, offset]
+
+    return {robot_id: tuple(values) for robot_id, values in coefficients.items()}
+
+
+def write_calibration(path: str, coefficients: dict[int, tuple[float, float, float, float]]) -> None:
+    """
+    Write fitted coefficients in the CSV layout read by johnbot2.load_calibration().
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CALIBRATION_FIELDS)
+        for robot_id, values in sorted(coefficients.items()):
+            writer.writerow([robot_id] + [f"{value:.6f}" for value in values])
+
+
+def cmd_fit_calibration(args) -> None:
+    readings = collect_sensor_readings(args.logs)
+    if not readings:
+        raise SystemExit("No robot columns found in the given logs")
+
+    coefficients = fit_calibration(readings, tuple(args.quantiles), args.min_frames)
+
+    print(f"Calibration fit over {len(args.logs)} log(s), quantiles {args.quantiles}")
+    for robot_id, (lg, lo, rg, ro) in sorted(coefficients.items()):
+        frames = readings[(robot_id, "left")].size
+        note = "" if frames >= args.min_frames else "  (too few frames, identity)"
+        print(f"  robot{robot_id}: left {lg:.3f}x{lo:+.1f}, right {rg:.3f}x{ro:+.1f}, "
+              f"{frames} frames{note}")
+
+    write_calibration(args.output, coefficients)
+    print(f"Calibration written to {args.output}")
+
+# -----------------------------------------------------------------------------
+# Prediction evaluation
+# -----------------------------------------------------------------------------
+
+def sensor_samples(columns: list[str], data: np.ndarray,
+                   fields: dict[str, int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (times, left, right) of a robot's distinct readings in a log.
+
+    Frames repeat a robot's latest reading until the next one arrives, so a
+    new sample is taken wherever the (left, right) pair changes; the frame
+    time is its arrival time to within one frame.
+    """
+    present = robot_present(data, fields)
+    times = data[present, columns.index("timestamp")]
+    left = data[present, fields["sensor_left"]]
+    right = data[present, fields["sensor_right"]]
+    changed = np.ones(left.size, dtype=bool)
+    changed[1:] = (np.diff(left) != 0.0) | (np.diff(right) != 0.0)
+    return times[changed], left[changed], right[changed]
+
+
+def event_sensor_samples(events: np.ndarray) -> dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    (times, left, right) per robot of every reading in an event log, coalesced
+    ones included, at its own receive time.
+    """
+    readings = events[np.isin(events["kind"], (johnbot2.EVENT_SENSOR, johnbot2.EVENT_SENSOR_COALESCED))]
+    samples = {}
+    for robot_id in np.unique(readings["robot"]).tolist():
+        robot = readings[readings["robot"] == robot_id]
+        samples[robot_id] = (robot["timestamp"], robot["left"].astype(np.float64),
+                             robot["right"].astype(np.float64))
+    return samples
+
+
+def evaluate_prediction(times: np.ndarray, left: np.ndarray, right: np.ndarray,
+                        horizon: float) -> tuple[float, float, int]:
+    """
+    Replay a robot's readings through johnbot2.SensorPredictor and score its
+    extrapolation `horizon` seconds ahead. Each prediction is compared with the
+    first reading that arrived at least `horizon` later, extrapolated to that
+    reading's own time, so both the prediction and the hold-last-reading
+    baseline are judged against a real measurement. Returns the RMS error of
+    each and the number of predictions scored.
+    """
+    target = np.searchsorted(times, times + horizon, side="left")
+    scored = target < times.size
+    if not scored.any():
+        return math.nan, math.nan, 0
+    target = np.where(scored, target, 0)
+    ahead = times[target] - times
+
+    predictor = johnbot2.SensorPredictor(1)
+    predicted = np.empty((times.size, 2))
+    for k, (t, sl, sr) in enumerate(zip(times.tolist(), left.tolist(), right.tolist())):
+        predictor.update(0, sl, sr, t)
+        predicted[k] = (predictor.left[0] + predictor.left_rate[0] * ahead[k],
+                        predictor.right[0] + predictor.right_rate[0] * ahead[k])
+
+    actual = np.column_stack((left[target], right[target]))[scored]
+    held = np.column_stack((left, right))[scored]
+    predicted = predicted[scored]
+    predict_rms = float(np.sqrt(np.mean((predicted - actual) ** 2)))
+    hold_rms = float(np.sqrt(np.mean((held - actual) ** 2)))
+    return predict_rms, hold_rms, int(scored.sum())
+
+
+def cmd_eval_prediction(args) -> None:
+    if args.alpha is not None:
+        johnbot2.PREDICTION_ALPHA = args.alpha
+    if args.beta is not None:
+        johnbot2.PREDICTION_BETA = args.beta
+
+    robots = []
+    for path in args.logs:
+        if is_event_log(path):
+            series = event_sensor_samples(load_event_log([path]))
+        else:
+            columns, data = load_log(path)
+            series = {
+                robot_id: sensor_samples(columns, data, fields)
+                for robot_id, fields in robot_columns(columns).items()
+            }
+        for robot_id, (times, left, right) in sorted(series.items()):
+            if times.size >= 3:
+                robots.append((path, robot_id, times, left, right))
+    if not robots:
+        raise SystemExit("No robot with enough readings in the given logs")
+
+    intervals = np.concatenate([np.diff(times) for _, _, times, _, _ in robots])
+    print(f"Prediction error, alpha-beta ({johnbot2.PREDICTION_ALPHA}, {johnbot2.PREDICTION_BETA}), "
+          f"{len(robots)} robot series, median reading interval "
+          f"{1000.0 * float(np.median(intervals)):.0f} ms")
+    print(f"  {'horizon':>8} {'hold RMS':>9} {'predict RMS':>12} {'change':>8} {'samples':>8}")
+
+    for horizon in args.horizons:
+        squared_predict = squared_hold = 0.0
+        count = 0
+        for _, _, times, left, right in robots:
+            predict_rms, hold_rms, n = evaluate_prediction(times, left, right, horizon)
+            if n:
+                squared_predict += predict_rms ** 2 * n
+                squared_hold += hold_rms ** 2 * n
+                count += n
+        if not count:
+            print(f"  {1000.0 * horizon:6.0f}ms   (log too short)")
+            continue
+        predict_rms = math.sqrt(squared_predict / count)
+        hold_rms = math.sqrt(squared_hold / count)
+        change = 100.0 * (predict_rms - hold_rms) / hold_rms if hold_rms else 0.0
+        print(f"  {1000.0 * horizon:6.0f}ms {hold_rms:9.2f} {predict_rms:12.2f} "
+              f"{change:+7.1f}% {count:8d}")
+
+# -----------------------------------------------------------------------------
+# Event logs
+# -----------------------------------------------------------------------------
+
+def write_event_csv(path: str, events: np.ndarray) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "t_ns", "robot", "kind", "source", "left", "right"])
+        for timestamp, t_ns, robot_id, kind, source, left, right in zip(
+                events["timestamp"].tolist(), events["t_ns"].tolist(), events["robot"].tolist(),
+                events["kind"].tolist(), events["source"].tolist(),
+                events["left"].tolist(), events["right"].tolist()):
+            writer.writerow([f"{timestamp:.6f}", t_ns, robot_id, johnbot2.EVENT_KINDS.get(kind, kind),
+                             source, f"{left:g}", f"{right:g}"])
+
+
+def cmd_events(args) -> None:
+    events = load_event_log(args.logs)
+    if not events.size:
+        raise SystemExit("No events in the given logs")
+
+    duration = (int(events["t_ns"][-1]) - int(events["t_ns"][0])) / 1e9
+    print(f"{events.size} events over {duration:.1f} s from {len(args.logs)} file(s)")
+    print(f"  {'robot':>5} {'sensor':>8} {'coalesced':>9} {'motor':>8} {'rate Hz':>8} "
+          f"{'interval ms p50/p99/max':>24} {'not in frames':>13}")
+
+    kinds = events["kind"]
+    readings = np.isin(kinds, (johnbot2.EVENT_SENSOR, johnbot2.EVENT_SENSOR_COALESCED))
+    frame_ns = round(args.frame_interval * 1e9)
+    for robot_id in np.unique(events["robot"]).tolist():
+        robot = events["robot"] == robot_id
+        times = events["t_ns"][robot & readings]
+        sensor = int(np.count_nonzero(robot & (kinds == johnbot2.EVENT_SENSOR)))
+        coalesced = times.size - sensor
+        motor = int(np.count_nonzero(robot & (kinds == johnbot2.EVENT_MOTOR)))
+        if times.size >= 2:
+            span = (int(times[-1]) - int(times[0])) / 1e9
+            rate = (times.size - 1) / span if span else math.nan
+            p50, p99, longest = np.percentile(np.diff(times) / 1e6, [50, 99, 100])
+            intervals = f"{p50:7.1f} /{p99:7.1f} /{longest:7.1f}"
+        else:
+            rate = math.nan
+            intervals = "-"
+        # A frame holds only the last reading that arrived before it
+        hidden = times.size - np.unique((times - events["t_ns"][0]) // frame_ns).size
+        print(f"  {robot_id:5d} {sensor:8d} {coalesced:9d} {motor:8d} {rate:8.1f} "
+              f"{intervals:>24} {hidden:13d}")
+
+    if args.output:
+        write_event_csv(args.output, events)
+        print(f"Wrote {args.output}")
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="johnbot2 log tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recompute = subparsers.add_parser(
+        "recompute", help="re-run the control law over a log's sensor values"
+    )
+    recompute.add_argument("log")
+    recompute.add_argument("--law", default=None, help="registered law name for every robot")
+    recompute.add_argument("--motor-max", type=float, default=None)
+    recompute.add_argument("--alpha", type=float, default=None)
+    recompute.add_argument("--calibration", default=None,
+                           help="calibration CSV (default: CALIBRATION_FILE in johnbot2.py)")
+    recompute.add_argument("--output", "-o", default=None)
+    recompute.set_defaults(func=cmd_recompute)
+
+    fit = subparsers.add_parser(
+        "fit-calibration", help="fit per-robot sensor gain/offset from logged readings"
+    )
+    fit.add_argument("logs", nargs="+")
+    fit.add_argument("--quantiles", type=float, nargs=2, default=[0.1, 0.9])
+    fit.add_argument("--min-frames", type=int, default=100)
+    fit.add_argument("--output", "-o", default="calibration.csv")
+    fit.set_defaults(func=cmd_fit_calibration)
+
+    evaluate = subparsers.add_parser(
+        "eval-prediction", help="score the latency-compensating predictor on logged readings"
+    )
+    evaluate.add_argument("logs", nargs="+")
+    evaluate.add_argument("--horizons", type=float, nargs="+", default=[0.05, 0.1, 0.15, 0.2])
+    evaluate.add_argument("--alpha", type=float, default=None)
+    evaluate.add_argument("--beta", type=float, default=None)
+    evaluate.set_defaults(func=cmd_eval_prediction)
+
+    summarize = subparsers.add_parser(
+        "events", help="per-robot summary of raw event logs (EVENT_LOG), optionally as CSV"
+    )
+    summarize.add_argument("logs", nargs="+", help="event logs of one run (main process and workers)")
+    summarize.add_argument("--frame-interval", type=float, default=johnbot2.FRAME_INTERVAL,
+                           help="frame log interval, to count readings no frame shows (s)")
+    summarize.add_argument("--output", "-o", default=None, help="write every event to this CSV")
+    summarize.set_defaults(func=cmd_events)
+
+    args = parser.parse_args()
+    johnbot2.logger.setLevel(johnbot2.logging.WARNING)
+    args.func(args)
@@ -0,0 +1,225 @@
+"""
+Checks of the controller's building blocks (no robots or sockets needed).
+
+Run from this directory with:
+
+    python -m pytest -q
+"""
+
+import random
+import struct
+
+import numpy as np
+import pytest
+
+import johnbot2
+
+# -----------------------------------------------------------------------------
+# Control law: scalar, batch and lookup table agree
+# -----------------------------------------------------------------------------
+
+ALPHAS = [1, 2, 3, 8, 16, 2.5, 7.5]
+
+
+@pytest.mark.parametrize("alpha", ALPHAS)
+def test_batch_law_matches_scalar_on_random_floats(alpha):
+    # Non-integer readings, as after calibration, filtering or prediction;
+    # negative and out-of-range values included
+    rng = np.random.default_rng(0)
+    left = rng.uniform(-10.0, 300.0, 5000)
+    right = rng.uniform(-10.0, 300.0, 5000)
+
+    batch_left, batch_right = johnbot2.map_sensors_to_motors_batch(left, right, 200, alpha)
+
+    scalar = [johnbot2.map_sensors_to_motors(sl, sr, 200, alpha)
+              for sl, sr in zip(left.tolist(), right.tolist())]
+    assert scalar == list(zip(batch_left.tolist(), batch_right.tolist()))
+
+
+@pytest.mark.parametrize("alpha", ALPHAS)
+def test_batch_sigmoid_matches_scalar_bit_for_bit(alpha):
+    x = np.random.default_rng(1).random(5000)
+    batch = johnbot2.sharp_sigmoid_batch(x, alpha)
+    assert [johnbot2.sharp_sigmoid(value, alpha) for value in x.tolist()] == batch.tolist()
+
+
+def test_batch_law_matches_scalar_at_rounding_boundary():
+    # A reading whose command sits next to a .5 boundary at alpha = 8
+    reading = (67.91903560147588, 50.0)
+    left, right = johnbot2.map_sensors_to_motors_batch([reading[0]], [reading[1]], 200, 8)
+    assert johnbot2.map_sensors_to_motors(*reading, 200, 8) == (left[0], right[0])
+
+
+@pytest.mark.parametrize("alpha", [8, 2.5])
+def test_motor_table_matches_scalar_law(alpha):
+    table = johnbot2.MotorTable(200, alpha)
+    for sl in range(0, 256, 3):
+        for sr in range(256):
+            assert table.lookup(sl, sr) == johnbot2.map_sensors_to_motors(sl, sr, 200, alpha)
+    # Off the integer grid, the table falls back to the formula
+    assert table.lookup(12.5, 300.0) == johnbot2.map_sensors_to_motors(12.5, 300.0, 200, alpha)
+
+
+def test_sharp_sigmoid_stays_finite_for_large_alpha():
+    assert johnbot2.sharp_sigmoid(0.5, 2048) == 0.5
+    assert johnbot2.sharp_sigmoid(0.6, 2048) == 1.0
+    assert johnbot2.sharp_sigmoid(0.4, 2048) == 0.0
+
+# -----------------------------------------------------------------------------
+# Selector ingest: latest-wins coalescing
+# -----------------------------------------------------------------------------
+
+def sensor_packet(left: int, right: int) -> bytes:
+    return johnbot2.SENSOR_PACKET_PREFIX + struct.pack(">ii", left, right)
+
+
+def fill_batch(datagrams: list[bytes]) -> johnbot2.DatagramBatch:
+    batch = johnbot2.DatagramBatch(size=len(datagrams))
+    for i, dgram in enumerate(datagrams):
+        batch.buffers[i][:len(dgram)] = dgram
+        batch.sizes[i] = len(dgram)
+        batch.addresses[i] = ("127.0.0.1", 9000)
+    batch.count = len(datagrams)
+    return batch
+
+
+class RecordingDispatcher:
+    def __init__(self, handled: list) -> None:
+        self.handled = handled
+
+    def call_handlers_for_packet(self, data: bytes, client_address) -> None:
+        self.handled.append(("dispatcher", data))
+
+
+@pytest.fixture
+def ingest(monkeypatch):
+    """
+    A fresh robot_buffer and a handle_sensor_values() that only records its calls.
+    """
+    handled = []
+    monkeypatch.setattr(johnbot2, "robot_buffer", johnbot2.RobotBuffer(2))
+    monkeypatch.setattr(johnbot2, "event_log", None)
+    monkeypatch.setattr(johnbot2, "SENSOR_FAST_PATH", True)
+    monkeypatch.setattr(johnbot2, "COALESCE_SENSOR_PACKETS", True)
+    monkeypatch.setattr(johnbot2, "handle_sensor_values",
+                        lambda robot_id, left, right: handled.append((robot_id, left, right)))
+    return handled
+
+
+def test_coalescing_handles_only_the_newest_packet(ingest):
+    batch = fill_batch([sensor_packet(1, 2), sensor_packet(3, 4), sensor_packet(5, 6)])
+    johnbot2.handle_sensor_batch(1, RecordingDispatcher(ingest), batch)
+
+    assert ingest == [(1, 5.0, 6.0)]
+    assert johnbot2.robot_buffer.coalesced(1) == 2
+    assert johnbot2.robot_buffer.coalesced(0) == 0
+
+
+def test_coalescing_flushes_before_a_dispatcher_datagram(ingest):
+    other = b"/LED\x00\x00\x00\x00,i\x00\x00\x00\x00\x00\x01"
+    batch = fill_batch([sensor_packet(1, 2), sensor_packet(3, 4), other, sensor_packet(5, 6)])
+    johnbot2.handle_sensor_batch(0, RecordingDispatcher(ingest), batch)
+
+    # Arrival order is kept: the run's newest packet, the other datagram, then the last run
+    assert ingest == [(0, 3.0, 4.0), ("dispatcher", other), (0, 5.0, 6.0)]
+    assert johnbot2.robot_buffer.coalesced(0) == 1
+
+
+def test_no_coalescing_handles_every_packet(ingest, monkeypatch):
+    monkeypatch.setattr(johnbot2, "COALESCE_SENSOR_PACKETS", False)
+    batch = fill_batch([sensor_packet(1, 2), sensor_packet(3, 4)])
+    johnbot2.handle_sensor_batch(0, RecordingDispatcher(ingest), batch)
+
+    assert ingest == [(0, 1.0, 2.0), (0, 3.0, 4.0)]
+    assert johnbot2.robot_buffer.coalesced(0) == 0
+
+# -----------------------------------------------------------------------------
+# Frame logging: queue overflow and missed frames
+# -----------------------------------------------------------------------------
+
+def queue_frames(queue: johnbot2.FrameQueue, count: int) -> None:
+    for value in range(count):
+        slot = queue.reserve()
+        if slot is not None:
+            slot[:] = value
+            queue.commit()
+
+
+@pytest.mark.parametrize("policy, kept", [("drop_newest", [0, 1, 2]), ("drop_oldest", [2, 3, 4])])
+def test_frame_queue_overflow_policy(policy, kept):
+    queue = johnbot2.FrameQueue(3, 2, policy)
+    queue_frames(queue, 5)
+
+    assert queue.dropped == 2
+    assert queue.drain(0.0)[:, 0].tolist() == kept
+    assert queue.depth() == 0
+
+
+def test_frame_queue_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        johnbot2.FrameQueue(3, 2, "block")
+
+
+def test_frame_clock_counts_missed_frames():
+    clock = johnbot2.FrameClock()
+    clock.start_ns = 0
+
+    assert clock.next_frame(clock.deadline_ns(0)) == 0
+    assert clock.next_frame(clock.deadline_ns(1) - 1) is None
+    assert clock.next_frame(clock.deadline_ns(1)) == 1
+    # Waking up just before frame 5 is due: frame 4 is written, 2 and 3 are missed
+    assert clock.next_frame(clock.deadline_ns(5) - 1) == 4
+    assert (clock.written, clock.missed) == (3, 2)
+    # Frame 4 is never written twice
+    assert clock.next_frame(clock.deadline_ns(5) - 1) is None
+
+
+def test_frame_clock_schedule_does_not_drift():
+    clock = johnbot2.FrameClock()
+    clock.start_ns = 0
+    frames = 24 * 3600
+    assert clock.deadline_ns(frames) == round(frames * johnbot2.FRAME_INTERVAL * 1e9)
+
+# -----------------------------------------------------------------------------
+# Sensor filters
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("name", sorted(johnbot2.SENSOR_FILTERS))
+def test_filter_restarts_after_silence(name):
+    sensor_filter = johnbot2.SENSOR_FILTERS[name](1)
+    sensor_filter.update(0, 10.0, 20.0, 100.0)
+    sensor_filter.update(0, 30.0, 40.0, 100.1)
+
+    # A robot silent for longer than FILTER_RESET_AFTER starts over from its next reading
+    later = 100.1 + johnbot2.FILTER_RESET_AFTER + 0.5
+    assert sensor_filter.update(0, 200.0, 100.0, later) == (200.0, 100.0)
+
+
+@pytest.mark.parametrize("name", sorted(johnbot2.SENSOR_FILTERS))
+def test_filter_batch_matches_per_packet(name):
+    rng = random.Random(2)
+    per_packet = johnbot2.SENSOR_FILTERS[name](3)
+    batched = johnbot2.SENSOR_FILTERS[name](3)
+    robot_ids = np.arange(3)
+
+    now = 10.0
+    for step in range(50):
+        # Every robot reports once per step; a long gap forces a restart
+        now += 2.0 if step == 25 else 0.1
+        left = [float(rng.randint(0, 255)) for _ in robot_ids]
+        right = [float(rng.randint(0, 255)) for _ in robot_ids]
+        expected = [per_packet.update(i, left[i], right[i], now) for i in robot_ids.tolist()]
+        got_left, got_right = batched.update_batch(
+            robot_ids, np.array(left), np.array(right), np.full(3, now)
+        )
+        np.testing.assert_allclose(got_left, [value[0] for value in expected], rtol=1e-12)
+        np.testing.assert_allclose(got_right, [value[1] for value in expected], rtol=1e-12)
+
+
+def test_median_filter_window():
+    sensor_filter = johnbot2.MedianFilter(1)
+    window = johnbot2.FILTER_WINDOW
+    readings = [float(value) for value in random.Random(3).sample(range(256), 3 * window)]
+    for step, value in enumerate(readings):
+        left, _ = sensor_filter.update(0, value, value, 1.0 + 0.01 * step)
+        assert left == float(np.median(readings[max(0, step + 1 - window):step + 1]))